@@ -1,69 +1,213 @@
+import json
+import os
+import re
+import socket
 import subprocess
 import sys
+import time
 from pathlib import Path
 from subprocess import CalledProcessError
 
-from scripts.venv_wrappers.bootstrap import build_configured_venv_from_repo_root
 from scripts.venv_wrappers.path import venv_python, find_repo_root
 
 GENERATOR_MODULE = "generation"  # what will be run via python -m
-LAUNCHER_VERSION = "2025.08.17.1"  # bump to force reinstallation of dependencies
+TIMING_VARIABLE = "GENERATE_TIMING"  # set to 1 to report launcher startup time on stderr
+SERVER_SOCKET = Path(GENERATOR_MODULE) / ".cache" / "server.sock"  # matches generation.server.server_socket_path
 
+REQUIREMENT_PATTERN = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)\s*(.*)$")
+SPECIFIER_PATTERN = re.compile(r"^(==|!=|>=|<=|>|<)\s*([0-9][0-9.]*)$")
+COMPARISONS = {
+    "==": lambda installed, required: installed == required,
+    "!=": lambda installed, required: installed != required,
+    ">=": lambda installed, required: installed >= required,
+    "<=": lambda installed, required: installed <= required,
+    ">": lambda installed, required: installed > required,
+    "<": lambda installed, required: installed < required,
+}
 
-def read_marker(venv_dir: Path) -> str | None:
+
+def version_tuple(version: str) -> tuple[int, ...]:
     """
-    Read the marker file indicating that the virtual environment has been created for a version.
+    Convert the release segment of a version string into a comparable tuple.
     Args:
-        venv_dir: The virtual environment directory.
-    Returns: String version if found, None otherwise.
+        version: A version such as "3.1.4" or "8.2.0rc1".
+    Returns: The numeric release parts, e.g. (3, 1, 4) or (8, 2, 0).
     """
-    marker = venv_dir / ".version"
-    return marker.read_text().strip() if marker.exists() else None
+    parts = []
+    for part in version.split("."):
+        digits = re.match(r"\d+", part)
+        if digits is None:
+            break
+        parts.append(int(digits.group()))
+    return tuple(parts)
 
 
-def write_marker(venv_dir: Path, version: str) -> None:
+def requirement_satisfied(line: str) -> bool:
     """
-    Write a marker file indicating that the virtual environment has been created for this version.
+    Check whether the running interpreter already has a distribution satisfying a requirement line.
+    Anything this simple check does not understand (extras, markers, ~=) counts as unsatisfied.
     Args:
-        venv_dir: The directory of the virtual environment.
-        version: The version to write.
+        line: A line from a requirements file, such as "jinja2>=3.1,<4".
+    Returns: True if the requirement is met by an installed distribution, False otherwise.
+    """
+    # Imported here so that forwarding to a running server never pays for it
+    from importlib import metadata
+
+    requirement = REQUIREMENT_PATTERN.match(line)
+    if requirement is None:
+        return False
+
+    name, specifiers = requirement.groups()
+    try:
+        installed = version_tuple(metadata.version(name))
+    except metadata.PackageNotFoundError:
+        return False
+
+    for specifier in filter(None, (part.strip() for part in specifiers.split(","))):
+        parsed = SPECIFIER_PATTERN.match(specifier)
+        if parsed is None or not COMPARISONS[parsed.group(1)](installed, version_tuple(parsed.group(2))):
+            return False
+    return True
+
+
+def interpreter_satisfies(requirements: Path) -> bool:
+    """
+    Check whether the running interpreter can run the CLI without its virtual environment.
+    Args:
+        requirements: The CLI's requirements file.
+    Returns: True if every requirement is already installed, False otherwise.
+    """
+    lines = (line.split("#", 1)[0].strip() for line in requirements.read_text().splitlines())
+    return all(requirement_satisfied(line) for line in lines if line)
+
+
+def report_startup(mode: str, started: float) -> None:
+    """
+    Report how long the launcher took before handing off to the CLI, when timing is requested.
+    Args:
+        mode: How the CLI is being started.
+        started: The perf_counter value when the launcher started.
     Returns: None
     """
-    (venv_dir / ".version").write_text(version)
+    if os.environ.get(TIMING_VARIABLE) == "1":
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"[launcher] {mode} after {elapsed:.1f} ms", file=sys.stderr)
 
 
-def needs_reinstall(venv_dir: Path) -> bool:
+def run_with_server(project_root: Path, started: float) -> int | None:
     """
-    Determine if we need to reinstall the virtual environment.
+    Forward the command to a running generation server, which runs it against this process's standard streams.
     Args:
-        venv_dir: The directory of the virtual environment.
-    Returns: True if we need to reinstall, False otherwise.
+        project_root: The repository root, where the server's socket lives.
+        started: The perf_counter value when the launcher started.
+    Returns: The command's exit code, or None if no server is running.
     """
-    return read_marker(venv_dir) != LAUNCHER_VERSION
+    socket_path = project_root / SERVER_SOCKET
+    if sys.argv[1:2] == ["serve"] or not hasattr(socket, "send_fds") or not socket_path.exists():
+        return None
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(str(socket_path))
+    except OSError:
+        connection.close()
+        return None  # a stale socket left by a server that is no longer running
 
+    report_startup("server handoff", started)
+    with connection:
+        request = json.dumps({"op": "run", "argv": sys.argv[1:]}).encode("utf-8") + b"\n"
+        socket.send_fds(connection, [request], [0, 1, 2])
+        reply = json.loads(connection.makefile("rb").readline() or b"{}")
 
-def main() -> None:
+    if "error" in reply:
+        print(f"Generation server error: {reply['error']}", file=sys.stderr)
+    return reply.get("exit_code", 1)
+
+
+def run_in_process(project_root: Path) -> None:
     """
-    Bootstrap the virtual environment if needed and run the CLI.
+    Run the CLI inside the current interpreter.
+    Args:
+        project_root: The repository root, which the CLI runs from.
     Returns: None
     """
-    project_root = find_repo_root()
-    virtual_directory = project_root / GENERATOR_MODULE / ".venv"
+    os.chdir(project_root)
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
 
-    if needs_reinstall(virtual_directory):
-        print("Setting up CLI environment (one-time)...", file=sys.stderr)
-        build_configured_venv_from_repo_root(GENERATOR_MODULE)
-        write_marker(virtual_directory, LAUNCHER_VERSION)
+    from generation.__main__ import main as generation_main
 
-    virtual_python = venv_python(virtual_directory)
+    try:
+        generation_main()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_in_venv(project_root: Path, virtual_python: Path) -> None:
+    """
+    Run the CLI under the virtual environment's interpreter.
+    On POSIX the launcher process is replaced with exec semantics; elsewhere it waits on a child process.
+    Args:
+        project_root: The repository root, which the CLI runs from.
+        virtual_python: The virtual environment's interpreter.
+    Returns: None
+    """
+    command = [str(virtual_python), "-m", GENERATOR_MODULE, *sys.argv[1:]]
+
+    if os.name == "posix":
+        try:
+            os.chdir(project_root)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execv(command[0], command)
+        except OSError:
+            pass  # fall back to a child process
 
     try:
-        subprocess.check_call([str(virtual_python), "-m", GENERATOR_MODULE, *sys.argv[1:]], cwd=project_root)
+        subprocess.check_call(command, cwd=project_root)
     except CalledProcessError as e:
         sys.exit(e.returncode)
     except KeyboardInterrupt:
         pass
 
 
+def main() -> None:
+    """
+    Run the CLI through a running server or in-process when possible,
+    otherwise bootstrap the virtual environment if needed and run it there.
+    Returns: None
+    """
+    started = time.perf_counter()
+    project_root = find_repo_root()
+    requirements = project_root / GENERATOR_MODULE / "requirements.txt"
+
+    server_exit_code = run_with_server(project_root, started)
+    if server_exit_code is not None:
+        sys.exit(server_exit_code)
+
+    if interpreter_satisfies(requirements):
+        report_startup("in-process", started)
+        run_in_process(project_root)
+        return
+
+    # The environment records what it was installed from in the bootstrap's own marker, which is checked here too
+    from scripts.venv_wrappers.bootstrap import (
+        build_configured_venv_from_repo_root,
+        dependencies_up_to_date,
+        requirements_fingerprint,
+    )
+
+    virtual_directory = project_root / GENERATOR_MODULE / ".venv"
+    cold = not dependencies_up_to_date(virtual_directory, requirements_fingerprint(requirements))
+
+    if cold:
+        print("Setting up CLI environment (one-time)...", file=sys.stderr)
+        if build_configured_venv_from_repo_root(GENERATOR_MODULE) == "failed":
+            sys.exit(1)
+
+    report_startup(f"{'cold' if cold else 'warm'} venv handoff", started)
+    run_in_venv(project_root, venv_python(virtual_directory))
+
+
 if __name__ == "__main__":
     main()
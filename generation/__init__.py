@@ -9,8 +9,9 @@
 - python -m generation_cli -> runs the click-based CLI (see __main__.py)
 
 Commands exposed by the CLI (see docs/content/usage.md):
-- new: create a new project from templates/<template>
+- new: create a new project from templates/<template>, or from several templates stacked as layers
 - add: add template files into an existing project directory
+- batch: render many projects from a JSONL/CSV manifest, reusing one environment and plan
 
 Template variables expected by templates/general/*.j2:
 - project_name, repo_name, repo_url, author, repo_remote_url (provided even if unused)
@@ -18,4 +19,7 @@
 Design notes:
 - We keep functions short and focused (see guidelines) and document behavior succinctly.
 - We avoid tight coupling: template root resolution and file rendering are pure functions.
+- The render pipeline lives in render.py, separate from the click commands, so worker processes can import it.
 """
+
+__version__ = "0.1.0"
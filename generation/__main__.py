@@ -1,172 +1,17 @@
-import shutil
-import subprocess
-from dataclasses import dataclass
-from datetime import datetime
+import os
 from pathlib import Path
-from typing import Iterable
 
 import click
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
 
-# Constants
-DEFAULT_TEMPLATE = "general"
-
-
-@dataclass(frozen=True)
-class RenderPlan:
-    """Represents a single file render/copy action.
-
-    Attributes:
-        source: The source file in the templates tree
-        target: The destination file path in the output tree
-        is_template: Whether the source has a .j2 suffix and should be rendered
-    """
-    source: Path
-    target: Path
-    is_template: bool
-
-
-def find_repo_root(start: Path) -> Path:
-    """Ascend from the start until a directory containing 'templates' exists.
-
-    This keeps the CLI resilient to being run from different working directories,
-    but still within the repository checked out. If not found, falls back to start.
-    """
-    cur = start.resolve()
-    for _ in range(10):  # safeguard to avoid walking the whole drive
-        if (cur / "templates").is_dir():
-            return cur
-        nxt = cur.parent
-        if nxt == cur:
-            break
-        cur = nxt
-    return start.resolve()
-
-
-def template_root(repo_root: Path, template: str) -> Path:
-    """Return the path to the template directory, validating it exists."""
-    root = repo_root / "templates" / template
-    if not root.is_dir():
-        raise click.ClickException(f"Template '{template}' not found at {root}")
-    return root
-
-
-def build_render_plan(src_root: Path, dest_root: Path) -> list[RenderPlan]:
-    """Walk the template tree and produce a render plan for all files.
-
-    - .j2 files are rendered, and the .j2 suffix is removed at destination.
-    - Other files are copied verbatim.
-    - Skips Python cache artifacts (e.g., __pycache__/ and *.pyc).
-    - Directories are mirrored implicitly by ensuring parent dirs exist during application.
-    """
-    plans: list[RenderPlan] = []
-    for path in src_root.rglob("*"):
-        if path.is_dir():
-            continue
-        # Skip cache artifacts from accidentally committed sources in templates
-        if "__pycache__" in path.parts or path.suffix == ".pyc":
-            continue
-        rel = path.relative_to(src_root)
-        is_tmpl = path.suffix == ".j2"
-        target_rel = rel.with_suffix("") if is_tmpl else rel
-        plans.append(RenderPlan(source=path, target=dest_root / target_rel, is_template=is_tmpl))
-    return plans
-
-
-def ensure_destination_for_new(dest: Path) -> None:
-    """Ensure destination directory exists for 'new' command.
-
-    Creates the directory if missing; raises if a non-directory exists.
-    """
-    if dest.exists() and not dest.is_dir():
-        raise click.ClickException(f"Destination path exists and is not a directory: {dest}")
-    dest.mkdir(parents=True, exist_ok=True)
-
-
-def jinja_env(root: Path) -> Environment:
-    """Create a strict Jinja2 environment rooted at the given template directory."""
-    return Environment(
-        loader=FileSystemLoader(root),
-        undefined=StrictUndefined,  # error on missing variables to catch mismatches early
-        autoescape=False,
-        keep_trailing_newline=True,
-        lstrip_blocks=False,
-        trim_blocks=False,
-    )
-
-
-def apply_plan(
-        env: Environment,
-        plan: Iterable[RenderPlan],
-        context: dict,
-        dry_run: bool,
-        confirm_overwrite: bool,
-        always_overwrite: bool,
-) -> None:
-    """Apply the render plan to disk.
+from generation import __version__
+from generation.lazy_group import LazyGroup
+from generation.options import ARCHIVE_FORMATS, COPY_MODES, DIFF_FORMATS, STDOUT_ARCHIVE
 
-    - If dry_run, prints actions and returns without writing.
-    - If `confirm_overwrite` is True, asks before replacing existing files.
-    """
-    for item in plan:
-        action = "render" if item.is_template else "copy"
-        exists = item.target.exists()
-        if dry_run:
-            click.echo(f"[DRY-RUN] {action}: {item.source} -> {item.target}")
-            continue
-
-        # Ensure directory exists
-        item.target.parent.mkdir(parents=True, exist_ok=True)
-
-        if exists and confirm_overwrite:
-            if not click.confirm(f"File exists: {item.target}. Overwrite?", default=False):
-                click.echo(f"Skipped existing file: {item.target}")
-                continue
-
-        if not confirm_overwrite and not always_overwrite:
-            continue
-
-        if item.is_template:
-            template_rel = str(item.source)
-            # Convert absolute path to loader-relative path
-            # The loader is configured at the template root, so compute the relative path
-            loader_root = Path(env.loader.searchpath[0])  # type: ignore[attr-defined]
-            # This must be a POSIX path for Jinja to parse it properly
-            template_name = Path(template_rel).resolve().relative_to(loader_root).as_posix()
-            tpl = env.get_template(str(template_name))
-            rendered = tpl.render(**context)
-            item.target.write_text(rendered, encoding="utf-8")
-        else:
-            shutil.copy2(item.source, item.target)
-        click.echo(f"Wrote {item.target}")
-
-
-def normalize_context(
-        project_name: str,
-        repo_name: str,
-        author: str,
-        repo_url: str,
-        repo_remote_url: str,
-        repo_docs_url: str,
-        contact_email: str,
-        security_email: str,
-) -> dict:
-    """Build the context dict passed to templates, ensuring all expected keys exist.
+# The render pipeline, Jinja and the server are imported inside the commands that use them, so --help, --version
+# and argument errors stay fast.
 
-    The templates currently reference: project_name, repo_name, repo_url, author.
-    We also include repo_remote_url even if not used, to future-proof templates.
-    """
-    return {
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "project_name": project_name,
-        "repo_name": repo_name if len(repo_name.strip()) < 0 else project_name,
-        "author": author,
-        "repo_url": repo_url,
-        "repo_remote_url": repo_remote_url,
-        "repo_docs_url": repo_docs_url,
-        "contact_email": contact_email,
-        "security_email": security_email,
-    }
+# Constants
+DEFAULT_TEMPLATE = "general"
 
 
 def prompt_missing_context(
@@ -178,70 +23,56 @@ def prompt_missing_context(
         repo_docs_url: str | None,
         contact_email: str | None,
         security_email: str | None,
+        prompt_to_stderr: bool = False,
 ) -> dict:
     """Prompt the user for any missing context fields and return a normalized context dict.
 
     Rules:
     - repo_name defaults to project_name if not provided; we show that default in the prompt.
     - author, repo_url, repo_remote_url: prompt when missing; allow empty responses.
+    - prompts go to stderr when `prompt_to_stderr` is set, keeping stdout free for archive output.
     """
     # repo_name: offer project_name as default if missing
     if repo_name in (None, ""):
-        repo_name = click.prompt("Repository name", default=project_name, show_default=True)
+        repo_name = click.prompt("Repository name", default=project_name, show_default=True, err=prompt_to_stderr)
 
     # author: prompt, allow empty
     if author is None:
-        author = click.prompt("Author", default="", show_default=False)
+        author = click.prompt("Author", default="", show_default=False, err=prompt_to_stderr)
 
     # repo_url: prompt, allow empty
     if repo_url is None:
-        repo_url = click.prompt("Repository URL", default="", show_default=False)
+        repo_url = click.prompt("Repository URL", default="", show_default=False, err=prompt_to_stderr)
 
     # repo_remote_url: prompt, allow empty
     if repo_remote_url is None:
-        repo_remote_url = click.prompt("Remote URL for git origin", default="", show_default=False)
+        repo_remote_url = click.prompt("Remote URL for git origin", default="", show_default=False,
+                                       err=prompt_to_stderr)
 
     # repo_docs_url: prompt, allow empty
     if repo_docs_url is None:
-        repo_docs_url = click.prompt("URL for project docs", default="", show_default=False)
+        repo_docs_url = click.prompt("URL for project docs", default="", show_default=False, err=prompt_to_stderr)
 
     # contact_email: prompt, allow empty
     if contact_email is None:
-        contact_email = click.prompt("The email to suggest for contact", default="", show_default=False)
+        contact_email = click.prompt("The email to suggest for contact", default="", show_default=False,
+                                     err=prompt_to_stderr)
 
     # security_email: prompt, allow empty
     if security_email is None:
-        security_email = click.prompt("The email to suggest for reporting sensitive issues", default="", show_default=False)
+        security_email = click.prompt("The email to suggest for reporting sensitive issues", default="", show_default=False,
+                                      err=prompt_to_stderr)
+
+    from generation.render import normalize_context
 
     return normalize_context(project_name, repo_name, author, repo_url, repo_remote_url, repo_docs_url, contact_email,
                              security_email)
 
 
-def execute_render(template_name: str, dest_path: Path, context: dict, dry_run: bool,
-                   always_overwrite: bool | None) -> None:
-    """
-    Common execution for both 'new' and 'add' commands: resolve paths, build plan, apply.
-    Args:
-        template_name: The name of the template to render.
-        dest_path: The path to the destination directory.
-        context: The context dict to pass to the template.
-        dry_run: Whether to just show the proposed changes without executing them.
-        always_overwrite: Whether to always overwrite existing files. None to prompt.
-    Returns: None
-    """
-    repo_root = find_repo_root(Path.cwd())
-    src_root = template_root(repo_root, template_name)
-
-    env = jinja_env(src_root)
-    plan = build_render_plan(src_root, dest_path)
-
-    # Always confirm overwriting for safety in both commands
-    apply_plan(env, plan, context, dry_run=dry_run, confirm_overwrite=always_overwrite is None,
-               always_overwrite=always_overwrite if always_overwrite is not None else False)
-
-
-@click.group(help="Project templating CLI. Creates or adds files from templates/ into a target directory.")
-@click.version_option(package_name="generation_cli")
+@click.group(cls=LazyGroup, help="Project templating CLI. Creates or adds files from templates/ into a target directory.",
+             lazy_commands={"bench": ("generation.benchmark:bench",
+                                      "Benchmark the generation pipeline on synthesized template trees.")})
+@click.version_option(version=__version__)
 def cli() -> None:
     """Entrypoint for the click group."""
     pass
@@ -267,10 +98,49 @@ def validate_overwrite_behavior(answer_no: bool | None, answer_yes: bool | None)
     return will_always_overwrite
 
 
+def validate_bundle_use(bundle_path: Path | None, render_processes: bool, copy_mode: str, other_option_used: bool,
+                        other_option: str) -> None:
+    """
+    Reject options that cannot be combined with --bundle.
+    Args:
+        bundle_path: The bundle passed with --bundle, if any
+        render_processes: Whether --render-processes was passed
+        copy_mode: The --copy-mode passed; a bundle's files are written out of it, so only 'auto' applies
+        other_option_used: Whether the command's other option that needs the templates was passed
+        other_option: The name of that option
+    Returns: None
+    """
+    if bundle_path is None:
+        return
+    if copy_mode != "auto":
+        raise click.UsageError(f"--copy-mode {copy_mode} cannot be used with --bundle, whose files are written out of "
+                               f"the bundle rather than copied")
+    if render_processes:
+        raise click.ClickException("Cannot specify both --bundle and --render-processes")
+    if other_option_used:
+        raise click.ClickException(f"Cannot specify both --bundle and {other_option}")
+
+
+def validate_stream_use(stream: bool, other_options: dict[str, bool]) -> None:
+    """
+    Reject options that cannot be combined with --stream, as they need the whole plan before anything is written.
+    Args:
+        stream: Whether --stream was passed
+        other_options: Whether each of those options was passed, by name
+    Returns: None
+    """
+    if not stream:
+        return
+    for option, used in other_options.items():
+        if used:
+            raise click.ClickException(f"Cannot specify both --stream and {option}")
+
+
 @cli.command(help="Create a new project from a template into a destination directory.")
-@click.option("--template", "template_name", default=DEFAULT_TEMPLATE, show_default=True, help="Template to use")
+@click.option("--template", "template_names", multiple=True, default=(DEFAULT_TEMPLATE,), show_default=True,
+              help="Template to use; repeat to stack layers, later ones overriding earlier ones file by file")
 @click.option("--path", "dest_path", type=click.Path(path_type=Path), help="Destination directory for the new project")
-@click.option("--project-name", prompt=True, help="Project name to use in templating")
+@click.option("--project-name", default=None, help="Project name to use in templating")
 @click.option("--repo-name", default=None, help="Repository name (defaults to project_name)")
 @click.option("--author", default=None, help="Author name")
 @click.option("--repo-url", default=None, help="Repository URL")
@@ -283,11 +153,59 @@ def validate_overwrite_behavior(answer_no: bool | None, answer_yes: bool | None)
 @click.option("-y", "--yes", "answer_yes", is_flag=True, default=None,
               help="Whether to answer YES to all overwrite prompts")
 @click.option("--dry-run", is_flag=True, default=False, help="Describe actions without making any changes")
-def new(template_name: str, dest_path: Path | None, project_name: str, repo_name: str | None, author: str | None,
+@click.option("--no-cache", is_flag=True, default=False,
+              help="Compile templates and walk the template tree without the on-disk caches")
+@click.option("--jobs", "workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of worker threads used to render, write and copy files")
+@click.option("--render-processes", is_flag=True, default=False,
+              help="Render templates in worker processes instead of threads, for CPU-heavy templates")
+@click.option("--copy-mode", type=click.Choice(COPY_MODES), default="auto", show_default=True,
+              help="How verbatim files are copied; 'hardlink' outputs must be treated as read-only")
+@click.option("--staged", is_flag=True, default=False,
+              help="Write every file beside the destination first, then sync and rename them into place together")
+@click.option("--bundle", "bundle_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=None,
+              help="Render from a bundle made by 'pack' instead of the templates (--template is then ignored)")
+@click.option("--stream", is_flag=True, default=False,
+              help="Write each file as the template tree is scanned, for trees too large to plan up front")
+@click.option("--git-commit/--no-git-commit", default=True, show_default=True,
+              help="Create the repository and its initial commit straight from the render output")
+@click.option("--push", is_flag=True, default=False,
+              help="Push the initial commit to --repo-remote-url; without it, generation works offline")
+@click.option("--profile", is_flag=True, default=False,
+              help="Print time per phase and template, bytes written and filesystem calls to stderr")
+@click.option("--trace-file", type=click.Path(dir_okay=False, path_type=Path), default=None,
+              help="Write a Chrome trace of the run's phases and templates to this file")
+@click.option("--output-archive", default=None,
+              help="Write the project into a tar, tar.gz or zip archive instead of a directory ('-' for stdout)")
+@click.option("--archive-format", type=click.Choice(ARCHIVE_FORMATS), default=None,
+              help="Archive format (inferred from the --output-archive suffix, otherwise tar)")
+def new(template_names: tuple[str, ...], dest_path: Path | None, project_name: str | None, repo_name: str | None, author: str | None,
         repo_url: str | None, repo_remote_url: str | None, repo_docs_url: str | None, contact_email: str | None,
         security_email: str | None, answer_no: bool | None, answer_yes: bool | None,
-        dry_run: bool) -> None:
+        dry_run: bool, no_cache: bool, workers: int, render_processes: bool, copy_mode: str, staged: bool,
+        bundle_path: Path | None, stream: bool, git_commit: bool, push: bool, profile: bool, trace_file: Path | None,
+        output_archive: str | None, archive_format: str | None) -> None:
+    from generation.git_commit import initial_commit
+    from generation.profiling import profiling_session
+    from generation.render import ensure_destination_for_new, run_bootstrap_task
+    from generation.runner import execute_render, export_archive
+
     always_overwrite = validate_overwrite_behavior(answer_no, answer_yes)
+    if push and not git_commit:
+        raise click.ClickException("Cannot specify both --push and --no-git-commit")
+    validate_bundle_use(bundle_path, render_processes, copy_mode, output_archive is not None, "--output-archive")
+    validate_stream_use(stream, {"--render-processes": render_processes, "--staged": staged,
+                                 "--bundle": bundle_path is not None, "--output-archive": output_archive is not None})
+    prompt_to_stderr = output_archive == STDOUT_ARCHIVE
+
+    if project_name is None:
+        project_name = click.prompt("Project name", err=prompt_to_stderr)
+
+    if output_archive is not None:
+        ctx = prompt_missing_context(project_name, repo_name, author, repo_url, repo_remote_url, repo_docs_url,
+                                     contact_email, security_email, prompt_to_stderr=prompt_to_stderr)
+        export_archive(template_names, ctx, output_archive, archive_format, use_cache=not no_cache)
+        return
 
     if dest_path is None:
         dest_path = click.prompt("Destination path", type=click.Path(path_type=Path))
@@ -301,22 +219,20 @@ def new(template_name: str, dest_path: Path | None, project_name: str, repo_name
     ctx = prompt_missing_context(project_name, repo_name, author, repo_url, repo_remote_url, repo_docs_url,
                                  contact_email, security_email)
 
-    execute_render(template_name, dest_path, ctx, dry_run, always_overwrite)
-
-    if not dry_run:
-        run_bootstrap_task(dest_path)
-
+    with profiling_session(profile, trace_file):
+        # With the repository already committed, the bootstrap task skips its own git steps
+        with initial_commit(dest_path, ctx["repo_remote_url"], push, enabled=git_commit and not dry_run) as snapshot:
+            execute_render(template_names, dest_path, ctx, dry_run, always_overwrite, use_cache=not no_cache,
+                           workers=workers, render_processes=render_processes, copy_mode=copy_mode, staged=staged,
+                           bundle_path=bundle_path, stream=stream, snapshot=snapshot)
 
-def run_bootstrap_task(dest_path: Path) -> None:
-    task_boostrap_command = [
-        "task",
-        "bootstrap",
-    ]
-    subprocess.check_call(task_boostrap_command, cwd=dest_path)
+        if not dry_run:
+            run_bootstrap_task(dest_path)
 
 
 @cli.command(help="Add template files into an existing project directory.")
-@click.option("--template", "template_name", default=DEFAULT_TEMPLATE, show_default=True, help="Template to use")
+@click.option("--template", "template_names", multiple=True, default=(DEFAULT_TEMPLATE,), show_default=True,
+              help="Template to use; repeat to stack layers, later ones overriding earlier ones file by file")
 @click.option("--path", "dest_path", type=click.Path(path_type=Path), default=Path("."), show_default=True,
               help="Target project directory")
 @click.option("--project-name", prompt=True, help="Project name to use in templating")
@@ -332,11 +248,42 @@ def run_bootstrap_task(dest_path: Path) -> None:
 @click.option("-y", "--yes", "answer_yes", is_flag=True, default=None,
               help="Whether to answer YES to all overwrite prompts")
 @click.option("--dry-run", is_flag=True, default=False, help="Describe actions without making any changes")
-def add(template_name: str, dest_path: Path, project_name: str, repo_name: str | None, author: str | None,
+@click.option("--no-cache", is_flag=True, default=False,
+              help="Compile templates and walk the template tree without the on-disk caches")
+@click.option("--jobs", "workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of worker threads used to render, write and copy files")
+@click.option("--render-processes", is_flag=True, default=False,
+              help="Render templates in worker processes instead of threads, for CPU-heavy templates")
+@click.option("--copy-mode", type=click.Choice(COPY_MODES), default="auto", show_default=True,
+              help="How verbatim files are copied; 'hardlink' outputs must be treated as read-only")
+@click.option("--staged", is_flag=True, default=False,
+              help="Write every file beside the destination first, then sync and rename them into place together")
+@click.option("--bundle", "bundle_path", type=click.Path(exists=True, dir_okay=False, path_type=Path), default=None,
+              help="Render from a bundle made by 'pack' instead of the templates (--template is then ignored)")
+@click.option("--stream", is_flag=True, default=False,
+              help="Write each file as the template tree is scanned, for trees too large to plan up front")
+@click.option("--profile", is_flag=True, default=False,
+              help="Print time per phase and template, bytes written and filesystem calls to stderr")
+@click.option("--trace-file", type=click.Path(dir_okay=False, path_type=Path), default=None,
+              help="Write a Chrome trace of the run's phases and templates to this file")
+@click.option("--diff", "diff_format", type=click.Choice(DIFF_FORMATS), is_flag=False, flag_value="unified",
+              default=None, help="Show what would change without writing: unified diffs, or a JSON summary with 'json'")
+def add(template_names: tuple[str, ...], dest_path: Path, project_name: str, repo_name: str | None, author: str | None,
         repo_url: str | None, repo_remote_url: str | None, repo_docs_url: str | None, contact_email: str | None,
         security_email: str | None, answer_no: bool | None, answer_yes: bool | None,
-        dry_run: bool) -> None:
+        dry_run: bool, no_cache: bool, workers: int, render_processes: bool, copy_mode: str, staged: bool,
+        bundle_path: Path | None, stream: bool, profile: bool, trace_file: Path | None,
+        diff_format: str | None) -> None:
+    from generation.profiling import profiling_session
+    from generation.render import run_bootstrap_task
+    from generation.runner import execute_render, preview_render
+
     always_overwrite = validate_overwrite_behavior(answer_no, answer_yes)
+    if dry_run and diff_format is not None:
+        raise click.ClickException("Cannot specify both --dry-run and --diff")
+    validate_bundle_use(bundle_path, render_processes, copy_mode, diff_format is not None, "--diff")
+    validate_stream_use(stream, {"--render-processes": render_processes, "--staged": staged,
+                                 "--bundle": bundle_path is not None, "--diff": diff_format is not None})
 
     dest_path = Path(dest_path)
 
@@ -347,10 +294,166 @@ def add(template_name: str, dest_path: Path, project_name: str, repo_name: str |
     ctx = prompt_missing_context(project_name, repo_name, author, repo_url, repo_remote_url, repo_docs_url,
                                  contact_email, security_email)
 
-    execute_render(template_name, dest_path, ctx, dry_run, always_overwrite)
+    with profiling_session(profile, trace_file):
+        if diff_format is not None:
+            preview_render(template_names, dest_path, ctx, diff_format, use_cache=not no_cache, workers=workers,
+                           render_processes=render_processes)
+            return
 
-    if not dry_run:
-        run_bootstrap_task(dest_path)
+        execute_render(template_names, dest_path, ctx, dry_run, always_overwrite, use_cache=not no_cache,
+                       workers=workers, render_processes=render_processes, copy_mode=copy_mode, staged=staged,
+                       bundle_path=bundle_path, stream=stream)
+
+        if not dry_run:
+            run_bootstrap_task(dest_path)
+
+
+@cli.command(help="Render templates into a project, then re-render the affected files whenever a template changes.")
+@click.option("--template", "template_names", multiple=True, default=(DEFAULT_TEMPLATE,), show_default=True,
+              help="Template to use; repeat to stack layers, later ones overriding earlier ones file by file")
+@click.option("--path", "dest_path", type=click.Path(path_type=Path), default=Path("."), show_default=True,
+              help="Target project directory")
+@click.option("--project-name", prompt=True, help="Project name to use in templating")
+@click.option("--repo-name", default=None, help="Repository name (defaults to project_name)")
+@click.option("--author", default=None, help="Author name")
+@click.option("--repo-url", default=None, help="Repository URL")
+@click.option("--repo-remote-url", default=None, help="Remote URL for git origin")
+@click.option("--repo-docs-url", default=None, help="URL for the git docs")
+@click.option("--contact-email", default=None, help="Email for contact")
+@click.option("--security-email", default=None, help="Email for reporting security issues for git origin")
+@click.option("-n", "--no", "answer_no", is_flag=True, default=None,
+              help="Whether to answer NO to all overwrite prompts of the initial render")
+@click.option("-y", "--yes", "answer_yes", is_flag=True, default=None,
+              help="Whether to answer YES to all overwrite prompts of the initial render")
+@click.option("--no-cache", is_flag=True, default=False,
+              help="Compile templates and walk the template tree without the on-disk caches")
+@click.option("--jobs", "workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of worker threads used to render, write and copy files")
+@click.option("--copy-mode", type=click.Choice(COPY_MODES), default="auto", show_default=True,
+              help="How verbatim files are copied; 'hardlink' outputs must be treated as read-only")
+@click.option("--interval", type=click.FloatRange(min=0.01), default=0.25, show_default=True,
+              help="Seconds between checks of the template files")
+@click.option("--debounce", type=click.FloatRange(min=0), default=0.1, show_default=True,
+              help="Seconds the template files must stay unchanged before an update runs")
+def watch(template_names: tuple[str, ...], dest_path: Path, project_name: str, repo_name: str | None,
+          author: str | None, repo_url: str | None, repo_remote_url: str | None, repo_docs_url: str | None,
+          contact_email: str | None, security_email: str | None, answer_no: bool | None, answer_yes: bool | None,
+          no_cache: bool, workers: int, copy_mode: str, interval: float, debounce: float) -> None:
+    from generation.caches import cache_locations
+    from generation.render import find_repo_root, template_layers
+    from generation.runner import execute_render
+    from generation.watch import WatchOptions, watch_templates
+
+    always_overwrite = validate_overwrite_behavior(answer_no, answer_yes)
+    dest_path = Path(dest_path)
+
+    if not dest_path.exists() or not dest_path.is_dir():
+        raise click.ClickException(f"Path does not exist or is not a directory: {dest_path}")
+
+    ctx = prompt_missing_context(project_name, repo_name, author, repo_url, repo_remote_url, repo_docs_url,
+                                 contact_email, security_email)
+
+    execute_render(template_names, dest_path, ctx, False, always_overwrite, use_cache=not no_cache, workers=workers,
+                   copy_mode=copy_mode)
+
+    repo_root = find_repo_root(Path.cwd())
+    options = WatchOptions(interval=interval, debounce=debounce, workers=workers, copy_mode=copy_mode)
+    watch_templates(template_layers(repo_root, template_names), dest_path, ctx, cache_locations(repo_root, not no_cache),
+                    options)
+
+
+@cli.command(help="Render many projects from a JSONL or CSV manifest of template contexts.")
+@click.option("--template", "template_names", multiple=True, default=(DEFAULT_TEMPLATE,), show_default=True,
+              help="Template to use; repeat to stack layers, later ones overriding earlier ones file by file")
+@click.option("--manifest", type=click.Path(exists=True, dir_okay=False, path_type=Path), required=True,
+              help="JSONL or CSV file with one project per row; each row needs 'path' and 'project_name'")
+@click.option("--jobs", "workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Number of worker processes to spread projects across")
+@click.option("--bootstrap/--no-bootstrap", default=True, show_default=True,
+              help="Whether to run 'task bootstrap' in each generated project")
+@click.option("-n", "--no", "answer_no", is_flag=True, default=None,
+              help="Whether to answer NO to all overwrite prompts")
+@click.option("-y", "--yes", "answer_yes", is_flag=True, default=None,
+              help="Whether to answer YES to all overwrite prompts")
+@click.option("--dry-run", is_flag=True, default=False, help="Describe actions without making any changes")
+@click.option("--no-cache", is_flag=True, default=False,
+              help="Compile templates and walk the template tree without the on-disk caches")
+@click.option("--copy-mode", type=click.Choice(COPY_MODES), default="auto", show_default=True,
+              help="How verbatim files are copied; 'hardlink' outputs must be treated as read-only")
+@click.option("--staged", is_flag=True, default=False,
+              help="Write every file beside the destination first, then sync and rename them into place together")
+@click.option("-v", "--verbose", is_flag=True, default=False,
+              help="Report the context keys each template reads and how often renders were reused")
+def batch(template_names: tuple[str, ...], manifest: Path, workers: int, bootstrap: bool, answer_no: bool | None,
+          answer_yes: bool | None, dry_run: bool, no_cache: bool, copy_mode: str, staged: bool, verbose: bool) -> None:
+    import time
+
+    from generation.batch import (
+        BatchOptions,
+        read_manifest,
+        render_batch,
+        report_context_keys,
+        report_throughput,
+        template_context_keys,
+    )
+    from generation.caches import cache_locations
+    from generation.render import find_repo_root, template_layers
+
+    always_overwrite = validate_overwrite_behavior(answer_no, answer_yes)
+    if always_overwrite is None:
+        raise click.ClickException("Batch mode cannot prompt; pass --yes or --no to decide overwrites")
+
+    jobs = read_manifest(manifest)
+    repo_root = find_repo_root(Path.cwd())
+    src_root = template_layers(repo_root, template_names)
+    options = BatchOptions(dry_run=dry_run, always_overwrite=always_overwrite, bootstrap=bootstrap,
+                           copy_mode=copy_mode, staged=staged)
+
+    caches = cache_locations(repo_root, not no_cache)
+    started = time.perf_counter()
+    results = render_batch(src_root, caches, jobs, workers, options)
+    report_throughput(results, time.perf_counter() - started, verbose)
+
+    if verbose and jobs:
+        report_context_keys(template_context_keys(src_root, caches, jobs[0].context))
+
+
+@cli.command(help="Pack templates into one bundle file that new and add can render from with --bundle.")
+@click.option("--template", "template_names", multiple=True, default=(DEFAULT_TEMPLATE,), show_default=True,
+              help="Template to pack; repeat to stack layers, later ones overriding earlier ones file by file")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), required=True,
+              help="The bundle file to write")
+@click.option("--no-cache", is_flag=True, default=False, help="Walk the template tree without the plan index")
+def pack(template_names: tuple[str, ...], output: Path, no_cache: bool) -> None:
+    from generation.runner import pack_bundle
+
+    pack_bundle(template_names, output, use_cache=not no_cache)
+
+
+@cli.command(help="Serve commands forwarded by generate.py over a local Unix socket, keeping templates warm.")
+@click.option("--stats", "show_stats", is_flag=True, default=False,
+              help="Print the running server's request-latency stats and exit")
+@click.option("--stop", is_flag=True, default=False, help="Stop the running server and exit")
+def serve(show_stats: bool, stop: bool) -> None:
+    from generation.render import find_repo_root
+    from generation.server import format_stats, request_server, serve_forever, server_socket_path
+
+    if show_stats and stop:
+        raise click.ClickException("Cannot specify both --stats and --stop")
+
+    repo_root = find_repo_root(Path.cwd())
+    socket_path = server_socket_path(repo_root)
+
+    if show_stats or stop:
+        reply = request_server(socket_path, {"op": "stop" if stop else "stats"})
+        if reply is None:
+            raise click.ClickException(f"No server is listening on {socket_path}")
+        click.echo("Server stopped" if stop else format_stats(reply))
+        return
+
+    # Commands forwarded by generate.py resolve paths from the repository root, as they do when run directly
+    os.chdir(repo_root)
+    serve_forever(socket_path, cli)
 
 
 def main() -> None:
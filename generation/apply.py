@@ -0,0 +1,475 @@
+"""
+Apply engine: writes a render plan to disk.
+
+Each target is first classified as new, unchanged or changed. Overwrite decisions are then made in plan order,
+parent directories are created once each, and the renders, writes and copies run on a pool of worker threads.
+Output is reported in plan order, so the result is the same whatever the worker count.
+
+Templates are rendered as a stream of chunks. New targets are streamed straight into a staging file beside the target,
+which then atomically replaces it. Existing targets are compared by streaming the output through a hash. That output
+is kept for the write only when it is small, and larger outputs are rendered again while writing, so memory stays
+bounded however large a template's output is.
+
+For template trees too large to plan up front, generation.streaming runs the same steps as a pipeline.
+"""
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+import click
+from jinja2 import Environment
+
+from generation.copying import copy_verbatim, linked_to_source
+from generation.digests import DigestManifest, bytes_digest, file_digest, streaming_digest
+from generation.git_commit import GitSnapshot
+from generation.profiling import active_profiler, add_bytes_written, count_filesystem_call, phase, span
+from generation.render import RenderPlan, template_name
+from generation.render_processes import render_in_processes
+from generation.staging import StagingArea
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+STREAM_CHUNK_ITEMS = 64  # pieces of template output joined into each streamed chunk
+MAX_KEPT_BYTES = 1024 * 1024  # outputs up to this size are kept in memory between comparing and writing them
+MAX_MEMO_BYTES = 64 * 1024 * 1024
+WRITE_BUFFER_BYTES = 256 * 1024
+
+
+class TargetStatus(Enum):
+    NEW = "new"
+    UNCHANGED = "unchanged"
+    CHANGED = "changed"
+
+
+@dataclass(frozen=True)
+class ApplyOptions:
+    """How apply_plan writes a render plan.
+
+    Attributes:
+        dry_run: Print the actions instead of writing anything
+        confirm_overwrite: Ask before replacing changed files
+        always_overwrite: Replace changed files without asking; with neither, existing files are left untouched
+        workers: Threads rendering and writing files, or processes rendering templates with render_processes
+        render_processes: Render templates on a process pool (see generation.render_processes)
+        copy_mode: How verbatim files are copied (see generation.copying)
+        staged_root: The destination root, to stage files beside it, sync them together and rename them into place
+            only once all of them were written, so a failure leaves the destination untouched (see generation.staging)
+    """
+    dry_run: bool = False
+    confirm_overwrite: bool = False
+    always_overwrite: bool = False
+    workers: int = 1
+    render_processes: bool = False
+    copy_mode: str = "auto"
+    staged_root: Path | None = None
+
+
+@dataclass(frozen=True)
+class ApplySummary:
+    """How many plan entries were written, already up to date, or left alone at the user's request."""
+    written: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+
+
+@dataclass(frozen=True)
+class MeasuredOutput:
+    """The digest and size of a template's output, and the output itself when it is small enough to keep."""
+    digest: str
+    size: int
+    content: bytes | None
+
+
+class RenderMemo:
+    """Rendered template outputs shared between plans, keyed by the fingerprint of their inputs.
+
+    Templates that read few context variables render identically for every project agreeing on those variables,
+    so a batch renders each distinct combination once. Only outputs small enough to keep are remembered, up to
+    MAX_MEMO_BYTES in total.
+    """
+
+    def __init__(self) -> None:
+        self.outputs: dict[str, MeasuredOutput] = {}
+        self.kept_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, fingerprint: str) -> MeasuredOutput | None:
+        """Return the output rendered from these inputs before, counting the lookup as a hit or a miss."""
+        with self.lock:
+            measured = self.outputs.get(fingerprint)
+            if measured is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return measured
+
+    def put(self, fingerprint: str, measured: MeasuredOutput) -> None:
+        """Remember an output, unless it was too large to keep or the memo is full."""
+        with self.lock:
+            if measured.content is None or self.kept_bytes + measured.size > MAX_MEMO_BYTES:
+                return
+            if self.outputs.setdefault(fingerprint, measured) is measured:
+                self.kept_bytes += measured.size
+
+
+class DiskFiles:
+    """Where verbatim plan entries come from: files on disk, named by their source path."""
+
+    def digest(self, source: Path) -> str:
+        return file_digest(source)
+
+    def size(self, source: Path) -> int:
+        return source.stat().st_size
+
+    def linked(self, source: Path, target_stat: os.stat_result) -> bool:
+        """Whether the target is a hardlink of the source."""
+        return linked_to_source(source, target_stat)
+
+    def copy(self, source: Path, target: Path, copy_mode: str) -> str:
+        """Copy the source to the target, returning the method used."""
+        return copy_verbatim(source, target, copy_mode)
+
+
+class PlanOutputs:
+    """Produces, and remembers, the digest and size of what each plan entry would write."""
+
+    def __init__(self, env: Environment, context: dict, rendered: dict[Path, str],
+                 fingerprints: dict[Path, str] | None = None, memo: RenderMemo | None = None,
+                 files: DiskFiles | None = None) -> None:
+        self.env = env
+        self.context = context
+        self.rendered = rendered
+        self.fingerprints = fingerprints or {}
+        self.memo = memo
+        self.files = files or DiskFiles()
+        self.measured: dict[Path, MeasuredOutput] = {}
+        self.digests: dict[Path, str] = {}
+
+    def measure(self, item: RenderPlan) -> MeasuredOutput:
+        """Render a template entry through a hash, keeping the output only when it is small."""
+        if item.target not in self.measured:
+            text = self.rendered.get(item.target)
+            if text is None:
+                self.measured[item.target] = self.render_measured(item)
+            else:
+                content = encode_text(text)
+                self.measured[item.target] = MeasuredOutput(bytes_digest(content), len(content), content)
+        return self.measured[item.target]
+
+    def render_measured(self, item: RenderPlan) -> MeasuredOutput:
+        """Render a template entry through a hash, reusing an output rendered from the same inputs when memoized."""
+        fingerprint = self.fingerprints.get(item.target)
+        if self.memo is None or fingerprint is None:
+            return measure_chunks(render_chunks(self.env, item, self.context))
+
+        measured = self.memo.get(fingerprint)
+        if measured is None:
+            measured = measure_chunks(render_chunks(self.env, item, self.context))
+            self.memo.put(fingerprint, measured)
+        return measured
+
+    def content(self, item: RenderPlan) -> bytes:
+        """Return the rendered bytes of a template entry, rendering it whole if it was too large to keep."""
+        kept = self.measure(item).content
+        return kept if kept is not None else render_bytes(self.env, item, self.context)
+
+    def chunks(self, item: RenderPlan) -> Iterable[bytes]:
+        """Return the rendered output of a template entry as chunks, rendering it again if it was not kept.
+
+        A memoized entry is looked up, or rendered into the memo, first so other plans can share its output.
+        """
+        measured = self.measured.get(item.target)
+        if measured is None and self.memo is not None and item.target in self.fingerprints:
+            measured = self.measure(item)
+        if measured is not None and measured.content is not None:
+            return [measured.content]
+        text = self.rendered.get(item.target)
+        return [encode_text(text)] if text is not None else render_chunks(self.env, item, self.context)
+
+    def forget(self, item: RenderPlan) -> None:
+        """Drop what is remembered about an entry once it has been written."""
+        self.measured.pop(item.target, None)
+        self.rendered.pop(item.target, None)
+        self.digests.pop(item.target, None)
+
+    def digest(self, item: RenderPlan) -> str:
+        """Return the digest of what the entry writes: the rendered bytes, or the source for verbatim files."""
+        if item.is_template:
+            return self.measure(item).digest
+        if item.target not in self.digests:
+            self.digests[item.target] = self.files.digest(item.source)
+        return self.digests[item.target]
+
+    def size(self, item: RenderPlan) -> int:
+        """Return the number of bytes the entry writes."""
+        return self.measure(item).size if item.is_template else self.files.size(item.source)
+
+
+@phase
+def apply_plan(
+        env: Environment,
+        plan: Iterable[RenderPlan],
+        context: dict,
+        options: ApplyOptions,
+        digests: DigestManifest | None = None,
+        fingerprints: dict[Path, str] | None = None,
+        memo: RenderMemo | None = None,
+        files: DiskFiles | None = None,
+        snapshot: GitSnapshot | None = None,
+) -> ApplySummary:
+    """Apply the render plan to disk, as the options say, and summarize what happened.
+
+    - Targets whose content would not change are never rewritten, nor prompted for.
+    - When `digests` is given, recorded targets are recognized as unchanged without reading them, and it is updated.
+    - `fingerprints` maps template targets to the fingerprint of their inputs (see generation.dependencies). With
+      `digests`, a target recorded with the same fingerprint and untouched since is unchanged without rendering it.
+    - With a `memo`, templates whose fingerprint was rendered before reuse that output instead of rendering again.
+    - `files` supplies verbatim entries from somewhere other than the filesystem, such as a template bundle.
+    - With a `snapshot`, every file written is also handed to it for the initial git commit (see generation.git_commit).
+    """
+    plan = list(plan)
+    if options.dry_run:
+        describe_plan(plan)
+        return ApplySummary()
+
+    fingerprints = fingerprints or {}
+    rendered = {}
+    if options.render_processes:
+        stale = [item for item in plan
+                 if digests is None or not digests.inputs_recorded(item.target, fingerprints.get(item.target))]
+        rendered = render_in_processes(env, stale, context, options.workers)
+    outputs = PlanOutputs(env, context, rendered, fingerprints, memo, files)
+    copy_mode, workers = options.copy_mode, options.workers
+    with span("classify_targets", "phase"):
+        statuses = list(ordered_map(lambda item: target_status(item, outputs, digests, copy_mode), plan, workers))
+    selected = [item for item, status in zip(plan, statuses)
+                if status is TargetStatus.NEW
+                or status is TargetStatus.CHANGED and should_overwrite(item, options)]
+    if options.staged_root is not None:
+        write_staged(selected, options.staged_root, outputs, digests, copy_mode, workers, snapshot)
+    else:
+        create_parent_directories(selected)
+        with span("write_targets", "phase"):
+            for item in ordered_map(lambda item: write_item(item, outputs, digests, copy_mode, snapshot=snapshot),
+                                    selected, workers):
+                click.echo(f"Wrote {item.target}")
+
+    unchanged = statuses.count(TargetStatus.UNCHANGED)
+    summary = ApplySummary(written=len(selected), unchanged=unchanged,
+                           skipped=len(plan) - len(selected) - unchanged)
+    click.echo(f"{summary.written} written, {summary.unchanged} unchanged, {summary.skipped} skipped")
+    return summary
+
+
+def describe_plan(plan: Iterable[RenderPlan]) -> None:
+    """Print the action each plan entry would take."""
+    for item in plan:
+        action = "render" if item.is_template else "copy"
+        click.echo(f"[DRY-RUN] {action}: {item.source} -> {item.target}")
+
+
+def target_status(item: RenderPlan, outputs: PlanOutputs, digests: DigestManifest | None,
+                  copy_mode: str = "auto") -> TargetStatus:
+    """Classify the target by comparing it with what the entry would write, cheapest checks first.
+
+    A verbatim target still hardlinked to its source counts as changed unless hardlinks are wanted, so that it is
+    replaced by an independent copy.
+    """
+    count_filesystem_call("stat")
+    try:
+        stat = item.target.stat()
+    except FileNotFoundError:
+        return TargetStatus.NEW
+
+    if not item.is_template and copy_mode != "hardlink" and outputs.files.linked(item.source, stat):
+        return TargetStatus.CHANGED
+    fingerprint = outputs.fingerprints.get(item.target)
+    if digests is not None and fingerprint is not None and digests.inputs_match(item.target, fingerprint, stat):
+        return TargetStatus.UNCHANGED
+    if digests is not None and digests.matches(item.target, outputs.digest(item), stat):
+        digests.record(item.target, outputs.digest(item), fingerprint, stat)
+        return TargetStatus.UNCHANGED
+    if stat.st_size != outputs.size(item):
+        return TargetStatus.CHANGED
+    count_filesystem_call("read")
+    if file_digest(item.target) != outputs.digest(item):
+        return TargetStatus.CHANGED
+
+    if digests is not None:
+        digests.record(item.target, outputs.digest(item), fingerprint, stat)
+    return TargetStatus.UNCHANGED
+
+
+def should_overwrite(item: RenderPlan, options: ApplyOptions) -> bool:
+    """Decide whether a changed target is replaced, prompting when the options ask to."""
+    if not options.confirm_overwrite:
+        return options.always_overwrite
+    if click.confirm(f"File exists: {item.target}. Overwrite?", default=False):
+        return True
+
+    click.echo(f"Skipped existing file: {item.target}")
+    return False
+
+
+def create_parent_directories(plan: Iterable[RenderPlan]) -> None:
+    """Create every distinct parent directory once, shallowest first."""
+    parents = {item.target.parent for item in plan}
+    for parent in sorted(parents, key=lambda path: len(path.parts)):
+        count_filesystem_call("mkdir")
+        parent.mkdir(parents=True, exist_ok=True)
+
+
+def ordered_map(function: Callable[[Item], Result], items: list[Item], workers: int) -> Iterable[Result]:
+    """Map over the items on a thread pool, yielding results in input order."""
+    if workers <= 1 or len(items) <= 1:
+        return map(function, items)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, items))
+
+
+def encode_text(text: str) -> bytes:
+    """Encode rendered text as written to disk, translating newlines to the platform convention like write_text."""
+    return text.replace("\n", os.linesep).encode("utf-8")
+
+
+def render_chunks(env: Environment, item: RenderPlan, context: dict) -> Iterator[bytes]:
+    """Render a template entry as a stream of encoded chunks, so its output never has to be held whole."""
+    name = template_name(env, item.source)
+    with span(name, "compile"):
+        template = env.get_template(name)
+
+    stream = template.stream(**context)
+    stream.enable_buffering(STREAM_CHUNK_ITEMS)
+    with span(name, "render"):
+        for text in stream:
+            yield encode_text(text)
+
+
+def measure_chunks(chunks: Iterable[bytes]) -> MeasuredOutput:
+    """Hash and count streamed output, keeping it only while it stays within MAX_KEPT_BYTES."""
+    digest = streaming_digest()
+    size = 0
+    kept: list[bytes] | None = []
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+        if kept is not None and size <= MAX_KEPT_BYTES:
+            kept.append(chunk)
+        else:
+            kept = None
+    return MeasuredOutput(digest.hexdigest(), size, b"".join(kept) if kept is not None else None)
+
+
+def keep_while_small(chunks: Iterable[bytes], kept: list[bytes]) -> Iterator[bytes]:
+    """Pass chunks through, copying them into `kept` only while their total stays within MAX_KEPT_BYTES."""
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size <= MAX_KEPT_BYTES:
+            kept.append(chunk)
+        else:
+            kept.clear()
+        yield chunk
+
+
+def write_atomically(target: Path, chunks: Iterable[bytes]) -> tuple[str, int]:
+    """
+    Stream chunks into a staging file beside the target, then move it over the target in one step.
+    Args:
+        target: The file to create or replace; an existing file's permissions are kept.
+        chunks: The content to write.
+    Returns: The digest and size of what was written.
+    """
+    staging = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    digest = streaming_digest()
+    size = 0
+    try:
+        with open(staging, "wb", buffering=WRITE_BUFFER_BYTES) as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        try:
+            shutil.copymode(target, staging)
+        except FileNotFoundError:
+            pass
+        os.replace(staging, target)
+    except BaseException:
+        staging.unlink(missing_ok=True)
+        raise
+    return digest.hexdigest(), size
+
+
+def render_bytes(env: Environment, item: RenderPlan, context: dict) -> bytes:
+    """Render a template entry into the bytes that would be written for it, timing compile and render apart."""
+    name = template_name(env, item.source)
+    if active_profiler() is None:
+        return encode_text(env.get_template(name).render(**context))
+
+    with span(name, "compile"):
+        template = env.get_template(name)
+    with span(name, "render"):
+        return encode_text(template.render(**context))
+
+
+def write_item(item: RenderPlan, outputs: PlanOutputs, digests: DigestManifest | None,
+               copy_mode: str = "auto", path: Path | None = None, snapshot: GitSnapshot | None = None) -> RenderPlan:
+    """Render or copy a single plan entry, recording its digest when a manifest is kept.
+
+    The file is written to `path` when given, such as a staging file later renamed over the target; the manifest
+    records it under the target, with the staged file's size and mtime, which the rename keeps. With a `snapshot`,
+    a small rendered output is handed to it as it was written; larger outputs and verbatim files are streamed to it
+    from the written file, so memory stays bounded.
+    """
+    path = item.target if path is None else path
+    if item.is_template:
+        kept: list[bytes] = []
+        chunks = outputs.chunks(item) if snapshot is None else keep_while_small(outputs.chunks(item), kept)
+        digest, size = write_atomically(path, chunks)
+        outputs.forget(item)
+        count_filesystem_call("write")
+        add_bytes_written(size)
+        if digests is not None:
+            digests.record(item.target, digest, outputs.fingerprints.get(item.target), path.stat())
+        if snapshot is not None and size <= MAX_KEPT_BYTES:
+            snapshot.add(item.target, b"".join(kept), path.stat().st_mode)
+        elif snapshot is not None:
+            snapshot.add_file(item.target, path)
+        return item
+
+    count_filesystem_call(outputs.files.copy(item.source, path, copy_mode))
+    if active_profiler() is not None:
+        add_bytes_written(outputs.size(item))
+    if digests is not None:
+        digests.record(item.target, outputs.digest(item), stat=path.stat())
+    if snapshot is not None:
+        snapshot.add_file(item.target, path)
+    return item
+
+
+def write_staged(selected: list[RenderPlan], dest_root: Path, outputs: PlanOutputs, digests: DigestManifest | None,
+                 copy_mode: str, workers: int, snapshot: GitSnapshot | None = None) -> None:
+    """Write the selected entries into a staging directory beside the destination, then commit them all at once.
+
+    If any render or copy fails, the destination is left untouched.
+    """
+    with StagingArea(dest_root) as staging:
+        staging.create_parent_directories(selected)
+        with span("stage_targets", "phase"):
+            list(ordered_map(lambda item: write_item(item, outputs, digests, copy_mode, staging.path(item.target),
+                                                     snapshot), selected, workers))
+        timings = staging.commit(selected)
+
+    for item in selected:
+        click.echo(f"Wrote {item.target}")
+    click.echo(f"Committed {len(selected)} files in {timings.total * 1000:.1f} ms "
+               f"(sync {timings.sync * 1000:.1f} ms, rename {timings.rename * 1000:.1f} ms)")
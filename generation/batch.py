@@ -0,0 +1,231 @@
+"""
+Batch generation: render many projects from one manifest in a single process.
+
+The template environment and render plan are built once per worker and reused for every destination,
+so stamping out hundreds of projects only pays the setup cost once per core. Each worker also memoizes template
+outputs by the fingerprint of their inputs, so a template is rendered once per distinct combination of the context
+keys it reads rather than once per project.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+
+import click
+from jinja2 import Environment
+
+from generation.apply import ApplyOptions, RenderMemo, apply_plan
+from generation.bytecode_cache import open_bytecode_cache
+from generation.caches import CacheLocations
+from generation.dependencies import DependencyGraph
+from generation.digests import DigestManifest
+from generation.render import (
+    RenderPlan,
+    TemplateSource,
+    build_render_plan,
+    jinja_env,
+    normalize_context,
+    relocate_plan,
+    run_bootstrap_task,
+)
+
+# Manifest keys forwarded to normalize_context; "path" names the destination and "date" may override today's date.
+CONTEXT_KEYS = (
+    "project_name",
+    "repo_name",
+    "author",
+    "repo_url",
+    "repo_remote_url",
+    "repo_docs_url",
+    "contact_email",
+    "security_email",
+)
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """A single project to render: where it goes and the context to render it with."""
+    destination: Path
+    context: dict
+
+
+@dataclass(frozen=True)
+class BatchOptions:
+    """Settings shared by every job in a batch."""
+    dry_run: bool
+    always_overwrite: bool
+    bootstrap: bool
+    copy_mode: str = "auto"
+    staged: bool = False
+
+
+@dataclass(frozen=True)
+class BatchResult:
+    """Throughput of a single rendered project."""
+    destination: Path
+    files_written: int
+    seconds: float
+    renders_reused: int = 0
+    renders: int = 0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files_written / self.seconds if self.seconds > 0 else 0.0
+
+
+# Per-process state built once by prepare_worker and reused by every job that process renders.
+_worker_env: Environment | None = None
+_worker_plan: list[RenderPlan] = []
+_worker_graph: DependencyGraph | None = None
+_worker_memo = RenderMemo()
+
+
+def context_from_row(row: dict, line: int) -> dict:
+    """
+    Convert a raw manifest row into a template context.
+    Args:
+        row: The manifest row as read from JSONL or CSV.
+        line: The manifest line number, used in error messages.
+    Returns: The normalized context dict.
+    """
+    if not str(row.get("project_name") or "").strip():
+        raise click.ClickException(f"Manifest line {line} is missing 'project_name'")
+
+    fields = {key: str(row.get(key) or "") for key in CONTEXT_KEYS}
+    context = normalize_context(**fields)
+    if row.get("date"):
+        context["date"] = str(row["date"])
+    return context
+
+
+def job_from_row(row: dict, line: int) -> BatchJob:
+    """Build a batch job from a manifest row, which must name its destination under 'path'."""
+    if not isinstance(row, dict):
+        raise click.ClickException(f"Manifest line {line} is not an object")
+    if not str(row.get("path") or "").strip():
+        raise click.ClickException(f"Manifest line {line} is missing 'path'")
+    return BatchJob(destination=Path(str(row["path"])), context=context_from_row(row, line))
+
+
+def read_manifest_rows(manifest: Path) -> list[tuple[int, dict]]:
+    """Read (line number, row) pairs from a JSONL or CSV manifest, chosen by file suffix."""
+    with manifest.open(encoding="utf-8", newline="") as handle:
+        if manifest.suffix.lower() == ".csv":
+            reader = csv.DictReader(handle)
+            return [(reader.line_num, row) for row in reader]
+
+        rows = []
+        for line, text in enumerate(handle, start=1):
+            if not text.strip():
+                continue
+            try:
+                rows.append((line, json.loads(text)))
+            except json.JSONDecodeError as e:
+                raise click.ClickException(f"Manifest line {line} is not valid JSON: {e}") from e
+        return rows
+
+
+def read_manifest(manifest: Path) -> list[BatchJob]:
+    """
+    Read every project described by a manifest.
+    Args:
+        manifest: A .jsonl or .csv file with one project per row.
+    Returns: The batch jobs in manifest order.
+    """
+    return [job_from_row(row, line) for line, row in read_manifest_rows(manifest)]
+
+
+def prepare_worker(src_root: TemplateSource, caches: CacheLocations) -> None:
+    """Build the Jinja environment, a destination-agnostic render plan and the template dependency graph for this
+    process."""
+    global _worker_env, _worker_plan, _worker_graph
+    _worker_env = jinja_env(src_root, open_bytecode_cache(caches.bytecode))
+    _worker_plan = build_render_plan(src_root, Path(), caches.plans)
+    _worker_graph = DependencyGraph.load(caches.dependencies, src_root)
+    _worker_graph.refresh(_worker_env, _worker_plan)
+    _worker_graph.save()
+
+
+def render_job(job: BatchJob, options: BatchOptions) -> BatchResult:
+    """Render one project using the state built by prepare_worker."""
+    started = time.perf_counter()
+    if not options.dry_run:
+        job.destination.mkdir(parents=True, exist_ok=True)
+
+    digests = DigestManifest.load(job.destination)
+    plan = relocate_plan(_worker_plan, job.destination)
+    hits, misses = _worker_memo.hits, _worker_memo.misses
+    apply_options = ApplyOptions(dry_run=options.dry_run, always_overwrite=options.always_overwrite,
+                                 copy_mode=options.copy_mode, staged_root=job.destination if options.staged else None)
+    summary = apply_plan(_worker_env, plan, job.context, apply_options, digests=digests,
+                         fingerprints=_worker_graph.fingerprints(plan, job.context), memo=_worker_memo)
+    if not options.dry_run:
+        digests.save()
+
+    if options.bootstrap and not options.dry_run:
+        run_bootstrap_task(job.destination)
+
+    reused = _worker_memo.hits - hits
+    return BatchResult(destination=job.destination, files_written=summary.written,
+                       seconds=time.perf_counter() - started, renders_reused=reused,
+                       renders=reused + _worker_memo.misses - misses)
+
+
+def render_batch(src_root: TemplateSource, caches: CacheLocations, jobs: list[BatchJob], workers: int,
+                 options: BatchOptions) -> list[BatchResult]:
+    """
+    Render every job, spreading them across worker processes when more than one worker is requested.
+    Args:
+        src_root: The template directory, or stack of layers, to render from.
+        caches: Where the bytecode cache and template tree index live.
+        jobs: The projects to render.
+        workers: The number of worker processes; 1 renders in-process.
+        options: Settings shared by every job.
+    Returns: The per-project results in job order.
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        prepare_worker(src_root, caches)
+        return [render_job(job, options) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=prepare_worker, initargs=(src_root, caches)) as pool:
+        return list(pool.map(render_job, jobs, repeat(options)))
+
+
+def template_context_keys(src_root: TemplateSource, caches: CacheLocations, context: dict) -> dict:
+    """Classify the templates by the context keys their output depends on; see DependencyGraph.context_keys."""
+    env = jinja_env(src_root)
+    plan = build_render_plan(src_root, Path(), caches.plans)
+    graph = DependencyGraph.load(caches.dependencies, src_root)
+    graph.refresh(env, plan)
+    return graph.context_keys(context)
+
+
+def report_throughput(results: list[BatchResult], elapsed: float, verbose: bool = False) -> None:
+    """Print per-project and overall throughput, and how often renders were reused when verbose."""
+    for result in results:
+        reuse = f", {result.renders_reused} of {result.renders} renders reused" if verbose else ""
+        click.echo(f"{result.destination}: {result.files_written} files in {result.seconds:.3f}s "
+                   f"({result.files_per_second:.1f} files/s{reuse})")
+
+    total_files = sum(result.files_written for result in results)
+    projects_per_second = len(results) / elapsed if elapsed > 0 else 0.0
+    click.echo(f"Rendered {len(results)} projects ({total_files} files) in {elapsed:.3f}s "
+               f"({projects_per_second:.1f} projects/s)")
+
+    if verbose:
+        reused = sum(result.renders_reused for result in results)
+        renders = sum(result.renders for result in results)
+        rate = reused / renders * 100 if renders else 0.0
+        click.echo(f"Render cache: {reused} of {renders} template renders reused ({rate:.1f}% hit rate)")
+
+
+def report_context_keys(context_keys: dict[str, tuple[str, ...] | None]) -> None:
+    """Print how many templates depend on each combination of context keys."""
+    groups = Counter("unknown" if keys is None else ", ".join(keys) or "no keys" for keys in context_keys.values())
+    click.echo("Templates by the context keys they read:")
+    for keys, count in sorted(groups.items(), key=lambda group: (-group[1], group[0])):
+        click.echo(f"  {keys}: {count}")
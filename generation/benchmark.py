@@ -0,0 +1,292 @@
+"""
+Benchmark suite for the generation pipeline.
+
+Synthesizes template trees of configurable size and mix, times each phase of a run, and emits JSON
+so that runs can be stored as baselines and compared for regressions.
+
+Phases:
+- discovery: find_repo_root from deep inside the tree
+- plan: build_render_plan walking and indexing the tree, and plan_indexed loading it from that index
+- compile: compiling every template
+- render: rendering every compiled template
+- write: writing rendered output and copying verbatim files into an empty destination
+- apply: apply_plan end to end into an empty destination
+
+`bench imports` separately checks the CLI's import time against a budget, using `python -X importtime`.
+"""
+import contextlib
+import io
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import click
+import jinja2
+
+from generation.apply import ApplyOptions, apply_plan, create_parent_directories, render_bytes
+from generation.render import (
+    RenderPlan,
+    build_render_plan,
+    find_repo_root,
+    jinja_env,
+    normalize_context,
+    template_name,
+)
+from generation.template_index import forget_loaded_trees
+
+DEFAULT_SIZES = "10,100,1000,10000"
+FILES_PER_DIRECTORY = 32
+TEMPLATE_LINE = "{{ project_name }} by {{ author }} ({{ repo_url }}) on {{ date }}\n"
+STATIC_LINE = "static content that appears in the output unchanged\n"
+TEMPLATE_LINE_INTERVAL = 16
+MINIMUM_REGRESSION_SECONDS = 0.001  # ignore slowdowns smaller than this, which are mostly noise
+STARTUP_MODULE = "generation.__main__"
+# Modules only a render, the server or a benchmark should load; importing them at startup slows every invocation.
+DEFERRED_MODULES = ("jinja2", "generation.apply", "generation.server", "multiprocessing")
+SLOWEST_IMPORTS = 10
+STARTUP_MARKER = "import time: interpreter started"  # written between the interpreter's own imports and the module's
+
+
+@dataclass(frozen=True)
+class TreeSpec:
+    """The shape of a synthesized template tree.
+
+    Attributes:
+        files: The number of files in the tree
+        template_ratio: The fraction of files that are .j2 templates
+        min_bytes: The smallest file size
+        max_bytes: The largest file size
+        seed: The random seed, so the same spec always produces the same tree
+    """
+    files: int
+    template_ratio: float
+    min_bytes: int
+    max_bytes: int
+    seed: int
+
+
+def synthesize_tree(root: Path, spec: TreeSpec) -> Path:
+    """Create templates/bench under the root following the spec and return the template directory."""
+    src_root = root / "templates" / "bench"
+    chooser = random.Random(spec.seed)
+
+    for index in range(spec.files):
+        is_template = chooser.random() < spec.template_ratio
+        size = chooser.randint(spec.min_bytes, spec.max_bytes)
+        directory = src_root / f"d{index // (FILES_PER_DIRECTORY ** 2)}" / f"d{index // FILES_PER_DIRECTORY}"
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = ".txt.j2" if is_template else ".txt"
+        (directory / f"f{index}{suffix}").write_text(file_content(size, is_template), encoding="utf-8")
+    return src_root
+
+
+def file_content(size: int, is_template: bool) -> str:
+    """Build roughly `size` bytes of text; templates substitute variables on every TEMPLATE_LINE_INTERVAL-th line."""
+    block = STATIC_LINE * (TEMPLATE_LINE_INTERVAL - 1)
+    block = TEMPLATE_LINE + block if is_template else STATIC_LINE + block
+    return block * max(1, size // len(block)) + (TEMPLATE_LINE if is_template else STATIC_LINE)
+
+
+def timed(function: Callable[[], object]) -> float:
+    """Return how long the function took to run, in seconds."""
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def write_outputs(plan: list[RenderPlan], rendered: dict[Path, bytes]) -> None:
+    """Write pre-rendered templates and copy verbatim files, as apply_plan does, without rendering."""
+    create_parent_directories(plan)
+    for item in plan:
+        if item.is_template:
+            item.target.write_bytes(rendered[item.target])
+        else:
+            shutil.copy2(item.source, item.target)
+
+
+def quiet_apply(src_root: Path, plan: list[RenderPlan], context: dict, workers: int) -> None:
+    """Run apply_plan with its per-file output discarded."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        apply_plan(jinja_env(src_root), plan, context, ApplyOptions(always_overwrite=True, workers=workers))
+
+
+def time_phases(work: Path, src_root: Path, workers: int) -> dict[str, float]:
+    """Time every phase once against a synthesized tree."""
+    context = normalize_context("bench", "bench", "author", "https://example.com", "", "", "", "")
+    phases = {"discovery": timed(lambda: find_repo_root(src_root / "d0" / "d0"))}
+
+    index_dir = work / "index"
+    forget_loaded_trees()
+    phases["plan"] = timed(lambda: build_render_plan(src_root, work / "out-write", index_dir))
+    forget_loaded_trees()
+    phases["plan_indexed"] = timed(lambda: build_render_plan(src_root, work / "out-write", index_dir))
+
+    plan = build_render_plan(src_root, work / "out-write")
+    templates = [item for item in plan if item.is_template]
+    env = jinja_env(src_root)
+    phases["compile"] = timed(lambda: [env.get_template(template_name(env, item.source)) for item in templates])
+
+    rendered: dict[Path, bytes] = {}
+    phases["render"] = timed(lambda: rendered.update((item.target, render_bytes(env, item, context))
+                                                     for item in templates))
+    phases["write"] = timed(lambda: write_outputs(plan, rendered))
+
+    apply_target = build_render_plan(src_root, work / "out-apply")
+    phases["apply"] = timed(lambda: quiet_apply(src_root, apply_target, context, workers))
+    return phases
+
+
+def benchmark_tree(spec: TreeSpec, repeat: int, workers: int) -> dict:
+    """Synthesize a tree and return the fastest time of each phase over the repeats."""
+    best: dict[str, float] = {}
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="generation-bench-") as directory:
+            work = Path(directory)
+            src_root = synthesize_tree(work, spec)
+            for phase, seconds in time_phases(work, src_root, workers).items():
+                best[phase] = min(seconds, best.get(phase, seconds))
+    return {"files": spec.files, "phases": best}
+
+
+def environment_metadata() -> dict:
+    """Describe where the benchmark ran, so results are only compared like for like."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jinja2": jinja2.__version__,
+    }
+
+
+def find_regressions(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """List every phase that got slower than the baseline by more than the threshold fraction."""
+    baseline_results = {result["files"]: result["phases"] for result in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        before = baseline_results.get(result["files"], {})
+        for phase, seconds in result["phases"].items():
+            previous = before.get(phase)
+            if previous is None or seconds - previous < MINIMUM_REGRESSION_SECONDS:
+                continue
+            if seconds > previous * (1 + threshold):
+                regressions.append(f"{result['files']} files / {phase}: {previous * 1000:.2f} ms -> "
+                                   f"{seconds * 1000:.2f} ms (+{(seconds / previous - 1) * 100:.0f}%)")
+    return regressions
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Import the module in a fresh interpreter and return every module it loaded with its cumulative microseconds.
+
+    Modules the interpreter imports while starting up, such as site, are left out, as the module did not load them.
+    """
+    code = f"import sys; print({STARTUP_MARKER!r}, file=sys.stderr, flush=True); import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    _, _, imported = result.stderr.partition(STARTUP_MARKER)
+    times: dict[str, int] = {}
+    for line in imported.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def parse_sizes(sizes: str) -> list[int]:
+    try:
+        parsed = [int(size) for size in sizes.split(",") if size.strip()]
+    except ValueError as e:
+        raise click.BadParameter(f"Sizes must be comma-separated integers: {sizes}") from e
+    if not parsed or min(parsed) < 1:
+        raise click.BadParameter("Sizes must be positive")
+    return parsed
+
+
+@click.group(help="Benchmark the generation pipeline on synthesized template trees.")
+def bench() -> None:
+    """Entrypoint for the bench command group."""
+    pass
+
+
+@bench.command(help="Time each phase of a run and print the results as JSON.")
+@click.option("--sizes", default=DEFAULT_SIZES, show_default=True, help="Comma-separated file counts to benchmark")
+@click.option("--template-ratio", type=click.FloatRange(0, 1), default=0.5, show_default=True,
+              help="Fraction of files that are .j2 templates")
+@click.option("--min-bytes", type=click.IntRange(min=1), default=256, show_default=True, help="Smallest file size")
+@click.option("--max-bytes", type=click.IntRange(min=1), default=8192, show_default=True, help="Largest file size")
+@click.option("--repeat", type=click.IntRange(min=1), default=3, show_default=True,
+              help="Runs per size; the fastest time of each phase is kept")
+@click.option("--jobs", "workers", type=click.IntRange(min=1), default=1, show_default=True,
+              help="Worker threads used by the apply phase")
+@click.option("--seed", type=int, default=0, show_default=True, help="Random seed for synthesizing trees")
+@click.option("--output", type=click.Path(dir_okay=False, path_type=Path), default=None,
+              help="Write the JSON results to this file instead of stdout")
+def run(sizes: str, template_ratio: float, min_bytes: int, max_bytes: int, repeat: int, workers: int, seed: int,
+        output: Path | None) -> None:
+    if min_bytes > max_bytes:
+        raise click.BadParameter("--min-bytes cannot exceed --max-bytes")
+
+    config = {"template_ratio": template_ratio, "min_bytes": min_bytes, "max_bytes": max_bytes,
+              "repeat": repeat, "jobs": workers, "seed": seed}
+    results = []
+    for files in parse_sizes(sizes):
+        click.echo(f"Benchmarking {files} files...", err=True)
+        spec = TreeSpec(files=files, template_ratio=template_ratio, min_bytes=min_bytes, max_bytes=max_bytes, seed=seed)
+        results.append(benchmark_tree(spec, repeat, workers))
+
+    report = json.dumps({"meta": environment_metadata(), "config": config, "results": results}, indent=2)
+    if output is None:
+        click.echo(report)
+    else:
+        output.write_text(report + "\n", encoding="utf-8")
+
+
+@bench.command(help="Compare benchmark results against a stored baseline and fail on regressions.")
+@click.argument("baseline", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("current", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--threshold", type=click.FloatRange(min=0), default=0.2, show_default=True,
+              help="Fractional slowdown tolerated before a phase counts as regressed")
+def compare(baseline: Path, current: Path, threshold: float) -> None:
+    baseline_report = json.loads(baseline.read_text(encoding="utf-8"))
+    current_report = json.loads(current.read_text(encoding="utf-8"))
+    if baseline_report.get("config") != current_report.get("config"):
+        click.echo("Warning: the runs used different configurations", err=True)
+
+    regressions = find_regressions(baseline_report, current_report, threshold)
+    if not regressions:
+        click.echo(f"No regressions beyond {threshold * 100:.0f}%")
+        return
+
+    for regression in regressions:
+        click.echo(f"REGRESSION {regression}")
+    raise click.ClickException(f"Found {len(regressions)} regression(s) beyond {threshold * 100:.0f}%")
+
+
+@bench.command(help="Check the CLI's import time against a budget and fail when it is exceeded.")
+@click.option("--budget-ms", type=click.FloatRange(min=0), default=100.0, show_default=True,
+              help="Largest tolerated import time of the CLI module")
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True,
+              help="Imports to measure; the fastest is compared with the budget")
+def imports(budget_ms: float, repeat: int) -> None:
+    runs = [import_times(STARTUP_MODULE) for _ in range(repeat)]
+    fastest = min(runs, key=lambda times: times.get(STARTUP_MODULE, 0))
+    total_ms = fastest.get(STARTUP_MODULE, 0) / 1000
+
+    click.echo(f"{STARTUP_MODULE} imported in {total_ms:.1f} ms (budget {budget_ms:.1f} ms)")
+    for name, microseconds in sorted(fastest.items(), key=lambda item: -item[1])[1:SLOWEST_IMPORTS + 1]:
+        click.echo(f"  {name}: {microseconds / 1000:.1f} ms")
+
+    failures = [f"{name} is imported at startup" for name in DEFERRED_MODULES if name in fastest]
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds the budget of {budget_ms:.1f} ms")
+    for failure in failures:
+        click.echo(f"REGRESSION {failure}")
+    if failures:
+        raise click.ClickException(f"Found {len(failures)} startup regression(s)")
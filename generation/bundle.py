@@ -0,0 +1,167 @@
+"""
+Template bundles: a template stack packed into one file, so generating from it needs no tree walk or per-file opens.
+
+A bundle is an uncompressed zip holding:
+- Jinja's compiled module for every template, imported through zipimport by a ModuleLoader, so templates are
+  neither read, lexed nor parsed again
+- every verbatim file, read straight out of a memory map of the bundle
+- bundle.json: the render plan, with each verbatim file's mode, mtime, size and digest, so comparing a destination
+  with the bundle never has to read the files themselves, and written files keep their template's mode and mtime
+"""
+import json
+import mmap
+import os
+import struct
+import zipfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import click
+import jinja2
+from jinja2 import Environment, ModuleLoader
+
+from generation.apply import DiskFiles, write_atomically
+from generation.digests import bytes_digest, file_digest
+from generation.render import (
+    ENVIRONMENT_OPTIONS,
+    RenderPlan,
+    TemplateSource,
+    build_render_plan,
+    jinja_env,
+    template_name,
+)
+
+MANIFEST_NAME = "bundle.json"
+FILES_PREFIX = "files/"
+BUNDLE_VERSION = 2
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")  # a zip entry's local file header, which precedes its data
+
+
+@dataclass(frozen=True)
+class BundleEntry:
+    """One output of a bundle.
+
+    Attributes:
+        output: The POSIX path of the output relative to the destination
+        template: The template's loader name, for rendered outputs
+        mode: The permission bits of a verbatim file
+        mtime_ns: The modification time of a verbatim file
+        size: The size of a verbatim file
+        digest: The SHA-256 hex digest of a verbatim file
+    """
+    output: str
+    template: str | None = None
+    mode: int = 0
+    mtime_ns: int = 0
+    size: int = 0
+    digest: str = ""
+
+
+class BundleLoader(ModuleLoader):
+    """Loads a bundle's compiled templates, naming templates by paths under the bundle as template_name expects."""
+
+    def __init__(self, bundle_path: Path) -> None:
+        super().__init__(bundle_path)
+        self.searchpath = [str(bundle_path.resolve())]
+
+
+def pack_templates(src_root: TemplateSource, output: Path, index_dir: Path | None) -> int:
+    """
+    Pack a template stack into a bundle, replacing any file at `output` atomically.
+    Args:
+        src_root: The template directory, or stack of layers, to pack.
+        output: The bundle file to write.
+        index_dir: Where the plan indexes are kept, if anywhere.
+    Returns: The number of outputs in the bundle.
+    """
+    env = jinja_env(src_root)
+    plan = build_render_plan(src_root, Path(), index_dir)
+    entries = [BundleEntry(output=item.target.as_posix(), template=template_name(env, item.source)) if item.is_template
+               else verbatim_entry(item) for item in plan]
+    templates = {entry.template for entry in entries if entry.template is not None}
+
+    staging = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    try:
+        env.compile_templates(staging, filter_func=templates.__contains__, zip="stored", ignore_errors=False)
+        with zipfile.ZipFile(staging, "a", zipfile.ZIP_STORED) as bundle:
+            for item, entry in zip(plan, entries):
+                if entry.template is None:
+                    bundle.write(item.source, FILES_PREFIX + entry.output)
+            manifest = {"version": BUNDLE_VERSION, "jinja": jinja2.__version__,
+                        "entries": [asdict(entry) for entry in entries]}
+            bundle.writestr(MANIFEST_NAME, json.dumps(manifest))
+        os.replace(staging, output)
+    except BaseException:
+        staging.unlink(missing_ok=True)
+        raise
+    return len(entries)
+
+
+def verbatim_entry(item: RenderPlan) -> BundleEntry:
+    """Describe a verbatim file as packed."""
+    stat = item.source.stat()
+    return BundleEntry(output=item.target.as_posix(), mode=stat.st_mode & 0o7777, mtime_ns=stat.st_mtime_ns,
+                       size=stat.st_size, digest=file_digest(item.source))
+
+
+class Bundle:
+    """An open bundle: its compiled templates, its verbatim files and its plan."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path.resolve()
+        with path.open("rb") as handle:
+            self.map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # The zip directory is read through the memory map too, rather than by opening the file again
+            with zipfile.ZipFile(self.map) as bundle:  # type: ignore[arg-type]
+                self.members = {info.filename: info for info in bundle.infolist()}
+            manifest = json.loads(bytes(self.member(MANIFEST_NAME)))
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            raise click.ClickException(f"{path} is not a template bundle: {e}") from e
+
+        if manifest.get("version") != BUNDLE_VERSION or manifest.get("jinja") != jinja2.__version__:
+            raise click.ClickException(f"{path} was packed by a different version of the generator or Jinja; "
+                                       f"pack it again")
+        self.entries = [BundleEntry(**entry) for entry in manifest["entries"]]
+        self.files = {self.path / FILES_PREFIX / entry.output: entry
+                      for entry in self.entries if entry.template is None}
+        self.env = Environment(loader=BundleLoader(self.path), **ENVIRONMENT_OPTIONS)
+
+    def member(self, name: str) -> memoryview:
+        """Return a stored member's bytes as a view of the memory map, without copying them."""
+        info = self.members[name]
+        header = LOCAL_HEADER.unpack_from(self.map, info.header_offset)
+        start = info.header_offset + LOCAL_HEADER.size + header[9] + header[10]
+        return memoryview(self.map)[start:start + info.file_size]
+
+    def render_plan(self, dest_root: Path) -> list[RenderPlan]:
+        """Return the bundle's plan against a destination, with sources named under the bundle path."""
+        return [RenderPlan(source=self.path / (entry.template or FILES_PREFIX + entry.output),
+                           target=dest_root / entry.output, is_template=entry.template is not None)
+                for entry in self.entries]
+
+
+class BundleFiles(DiskFiles):
+    """Supplies a bundle's verbatim files to the apply engine from the memory map."""
+
+    def __init__(self, bundle: Bundle) -> None:
+        self.bundle = bundle
+
+    def digest(self, source: Path) -> str:
+        return self.bundle.files[source].digest
+
+    def size(self, source: Path) -> int:
+        return self.bundle.files[source].size
+
+    def linked(self, source: Path, target_stat: os.stat_result) -> bool:
+        return False
+
+    def copy(self, source: Path, target: Path, copy_mode: str) -> str:
+        entry = self.bundle.files[source]
+        content = self.bundle.member(FILES_PREFIX + entry.output)
+        if bytes_digest(content) != entry.digest:
+            raise click.ClickException(f"{self.bundle.path} is corrupt: {entry.output} does not match its digest")
+        write_atomically(target, [content])
+        os.chmod(target, entry.mode)
+        os.utime(target, ns=(entry.mtime_ns, entry.mtime_ns))
+        return "bundle"
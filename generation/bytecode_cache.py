@@ -0,0 +1,110 @@
+"""
+Persistent, size-bounded cache of compiled Jinja templates.
+
+Repeat runs load compiled template code from disk instead of lexing and compiling every .j2 file again.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from jinja2 import FileSystemBytecodeCache
+from jinja2.bccache import Bucket
+
+CACHE_PATTERN = "%s.jinja-cache"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+def bytecode_cache_dir(repo_root: Path) -> Path:
+    """Return the directory compiled templates are cached in for this repository."""
+    return repo_root / "generation" / ".cache" / "bytecode"
+
+
+def open_bytecode_cache(directory: Path | None) -> "BoundedBytecodeCache | None":
+    """Open the cache at the directory, or return None when caching is disabled."""
+    return BoundedBytecodeCache(directory) if directory is not None else None
+
+
+class BoundedBytecodeCache(FileSystemBytecodeCache):
+    """A bytecode cache keyed by template path and mtime, validated by content hash, and evicted least-recently-used.
+
+    Jinja already rejects a cached entry whose source checksum no longer matches, so keying on the mtime as well
+    only makes stale entries unreachable sooner; eviction then reclaims them.
+
+    The cache directory is listed once, on the first write, and its size is then tracked as entries are written, so
+    the directory is only listed again when the budget is exceeded. Other processes writing to the same directory are
+    caught up with at that point.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(directory), CACHE_PATTERN)
+        self.cache_dir = directory
+        self.max_bytes = max_bytes
+        self.total_bytes: int | None = None  # unknown until the first write
+        self.lock = threading.Lock()
+
+    def get_cache_key(self, name: str, filename: str | None = None) -> str:
+        identity = f"{name}|{filename}|{modified_time(filename)}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        super().load_bytecode(bucket)
+        if bucket.code is not None:
+            touch(Path(self._get_cache_filename(bucket)))
+
+    def dump_bytecode(self, bucket: Bucket) -> None:
+        super().dump_bytecode(bucket)
+        try:
+            written = os.stat(self._get_cache_filename(bucket)).st_size
+        except OSError:
+            written = 0
+
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(stat.st_size for _, stat in cache_entries(self.cache_dir))
+            else:
+                self.total_bytes += written
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self) -> None:
+        """Remove the least recently used entries until the cache fits within its size budget."""
+        entries = sorted(cache_entries(self.cache_dir), key=lambda entry: entry[1].st_mtime_ns)
+        total = sum(stat.st_size for _, stat in entries)
+
+        for path, stat in entries:
+            if total <= self.max_bytes:
+                break
+            total -= stat.st_size
+            path.unlink(missing_ok=True)
+        self.total_bytes = total
+
+
+def modified_time(filename: str | None) -> int:
+    """Return the file's mtime in nanoseconds, or 0 when there is no file to inspect."""
+    if filename is None:
+        return 0
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def touch(path: Path) -> None:
+    """Mark a cache entry as recently used, ignoring entries removed by a concurrent eviction."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def cache_entries(directory: Path) -> list[tuple[Path, os.stat_result]]:
+    """List the cache entries in the directory with their stats, skipping any removed concurrently."""
+    entries = []
+    for path in directory.glob(CACHE_PATTERN % "*"):
+        try:
+            entries.append((path, path.stat()))
+        except OSError:
+            continue
+    return entries
@@ -0,0 +1,31 @@
+"""
+Locations of the on-disk caches that speed up repeat runs.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+
+from generation.bytecode_cache import bytecode_cache_dir
+from generation.dependencies import dependency_graph_dir
+from generation.template_index import plan_index_dir
+
+
+@dataclass(frozen=True)
+class CacheLocations:
+    """Where each cache lives; None disables that cache.
+
+    Attributes:
+        bytecode: Directory of compiled Jinja templates
+        plans: Directory of template tree indexes used to skip walking unchanged trees
+        dependencies: Directory of template dependency graphs used to skip rendering outputs whose inputs are unchanged
+    """
+    bytecode: Path | None = None
+    plans: Path | None = None
+    dependencies: Path | None = None
+
+
+def cache_locations(repo_root: Path, enabled: bool) -> CacheLocations:
+    """Return the cache locations for this repository, or no caches at all when disabled."""
+    if not enabled:
+        return CacheLocations()
+    return CacheLocations(bytecode=bytecode_cache_dir(repo_root), plans=plan_index_dir(repo_root),
+                          dependencies=dependency_graph_dir(repo_root))
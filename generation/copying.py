@@ -0,0 +1,136 @@
+"""
+Copy strategies for verbatim template files.
+
+- reflink: clone the source's extents (FICLONE) so the copy shares storage until either side is modified
+- hardlink: link the target to the source; the output must be treated as read-only, since editing it edits the template
+- copy: shutil.copy2
+- auto: reflink, then a kernel-side copy (copy_file_range, then sendfile), then a plain userspace copy
+
+Every strategy except hardlink gives the target the source's permission bits and timestamps, as copy2 does. Each one
+copies into a staging file beside the target, which then replaces it, so a failed copy leaves an existing target alone.
+"""
+import errno
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+import click
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+REFLINK_SUPPORTED = fcntl is not None and sys.platform.startswith("linux")
+
+# Errors meaning "this filesystem or kernel cannot do that", after which the next strategy is tried.
+UNSUPPORTED_ERRORS = frozenset({
+    errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM, errno.EBADF,
+})
+
+
+def copy_verbatim(source: Path, target: Path, copy_mode: str) -> str:
+    """
+    Copy a verbatim file into place with the given strategy.
+    Args:
+        source: The template file to copy.
+        target: The output path, which is replaced if it exists.
+        copy_mode: One of generation.options.COPY_MODES.
+    Returns: The method that copied the file: "reflink", "copy_file_range", "sendfile", "copy" or "hardlink".
+    The copy or link is made beside the target and then moved over it in one step, so an existing target is never
+    truncated, is left as it was when copying fails, and is never seen half-written.
+    """
+    staging = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        method = copy_to(source, staging, copy_mode)
+        os.replace(staging, target)
+    finally:
+        # Also removes the staging link when the target already was a hardlink of the source, which rename keeps
+        staging.unlink(missing_ok=True)
+    return method
+
+
+def copy_to(source: Path, target: Path, copy_mode: str) -> str:
+    """Copy a verbatim file to a path that does not exist yet, returning the method used."""
+    if copy_mode == "hardlink":
+        try:
+            os.link(source, target)
+        except OSError as e:
+            raise click.ClickException(f"Cannot hardlink {source} into {target.parent}: {e.strerror}. "
+                                       f"Use --copy-mode auto instead") from e
+        return "hardlink"
+
+    if copy_mode == "copy":
+        shutil.copy2(source, target)
+        return "copy"
+
+    method = copy_data(source, target, reflink_only=copy_mode == "reflink")
+    shutil.copystat(source, target)
+    return method
+
+
+def linked_to_source(source: Path, target_stat: os.stat_result) -> bool:
+    """Whether a target is a hardlink of its source, checking the link count first so most targets cost no stat."""
+    return target_stat.st_nlink > 1 and os.path.samestat(target_stat, source.stat())
+
+
+def copy_data(source: Path, target: Path, reflink_only: bool) -> str:
+    """Copy the file contents with the cheapest method that works, returning its name."""
+    with source.open("rb") as source_file, target.open("xb") as target_file:
+        if try_reflink(source_file, target_file):
+            return "reflink"
+        if reflink_only:
+            raise click.ClickException(f"Cannot reflink {source} into {target.parent}: the filesystem does not "
+                                       f"support it. Use --copy-mode auto instead")
+
+        size = os.fstat(source_file.fileno()).st_size
+        for method, transfer in kernel_transfers():
+            if transfer_all(source_file.fileno(), target_file.fileno(), size, transfer):
+                return method
+
+        shutil.copyfileobj(source_file, target_file)
+        return "copy"
+
+
+def try_reflink(source_file: BinaryIO, target_file: BinaryIO) -> bool:
+    """Clone the source into the target, returning False when the filesystem cannot."""
+    if not REFLINK_SUPPORTED:
+        return False
+    try:
+        fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+    except OSError as e:
+        if e.errno in UNSUPPORTED_ERRORS:
+            return False
+        raise
+    return True
+
+
+def kernel_transfers() -> list[tuple[str, Callable[[int, int, int, int], int]]]:
+    """Return the in-kernel copy calls this platform has, as (name, transfer(source, target, offset, count))."""
+    transfers = []
+    if hasattr(os, "copy_file_range"):
+        transfers.append(("copy_file_range", lambda source, target, offset, count:
+                          os.copy_file_range(source, target, count, offset)))
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        transfers.append(("sendfile", lambda source, target, offset, count:
+                          os.sendfile(target, source, offset, count)))
+    return transfers
+
+
+def transfer_all(source_fd: int, target_fd: int, size: int, transfer: Callable[[int, int, int, int], int]) -> bool:
+    """Copy `size` bytes with an in-kernel transfer, returning False if it is unsupported before any byte moved."""
+    copied = 0
+    while copied < size:
+        try:
+            count = transfer(source_fd, target_fd, copied, size - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in UNSUPPORTED_ERRORS:
+                return False
+            raise
+        if count == 0:
+            break
+        copied += count
+    return True
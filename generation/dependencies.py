@@ -0,0 +1,199 @@
+"""
+Template dependency graph: which templates each template includes, imports or extends, and which context variables
+it reads, as found by jinja2.meta.
+
+The graph of a template stack is persisted beside the plan indexes, along with the mtime, size and digest of each
+template, so a run only parses the templates that changed since the last one. From the graph, every template output
+gets an inputs fingerprint: a hash of its template and everything that template references, and of the values of
+the context variables they read. The digest manifest records that fingerprint, so an output whose inputs are
+unchanged is known to be up to date without rendering it.
+"""
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from jinja2 import Environment, TemplateSyntaxError, meta
+
+from generation.digests import bytes_digest
+from generation.profiling import count_filesystem_call
+from generation.render import RenderPlan, TemplateSource, as_layers, template_name
+
+GRAPH_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TemplateNode:
+    """What is known about one template source.
+
+    Attributes:
+        mtime_ns: The source's mtime when it was last parsed or hashed
+        size: The source's size at that time
+        digest: The SHA-256 hex digest of the source
+        references: The templates it includes, imports or extends
+        variables: The context variables it reads
+        dynamic: Whether it references a template by a computed name, so its inputs cannot be known
+    """
+    mtime_ns: int
+    size: int
+    digest: str
+    references: list[str]
+    variables: list[str]
+    dynamic: bool = False
+
+
+def dependency_graph_dir(repo_root: Path) -> Path:
+    """Return the directory dependency graphs are stored in for this repository."""
+    return repo_root / "generation" / ".cache" / "dependencies"
+
+
+def graph_path(graph_dir: Path, src_root: TemplateSource) -> Path:
+    """Return the graph file for a template stack."""
+    key = "\n".join(str(layer.resolve()) for layer in as_layers(src_root))
+    return graph_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def parse_template(env: Environment, name: str, source: bytes, stat: os.stat_result) -> TemplateNode:
+    """Find what a template references and reads; a template that does not parse is treated as dynamic."""
+    try:
+        ast = env.parse(source.decode("utf-8"), name)
+    except (TemplateSyntaxError, UnicodeDecodeError):
+        return TemplateNode(stat.st_mtime_ns, stat.st_size, bytes_digest(source), [], [], dynamic=True)
+
+    references = list(meta.find_referenced_templates(ast))
+    return TemplateNode(stat.st_mtime_ns, stat.st_size, bytes_digest(source),
+                        references=sorted(reference for reference in references if reference is not None),
+                        variables=sorted(meta.find_undeclared_variables(ast)),
+                        dynamic=None in references)
+
+
+class DependencyGraph:
+    """The templates of a stack by loader name, and the plan sources those names resolve to."""
+
+    def __init__(self, path: Path | None, nodes: dict[str, TemplateNode]) -> None:
+        self.path = path
+        self.nodes = nodes
+        self.names: dict[Path, str] = {}
+        self.changed = False
+        self._closures: dict[str, frozenset[str] | None] = {}
+
+    @classmethod
+    def load(cls, graph_dir: Path | None, src_root: TemplateSource) -> "DependencyGraph":
+        """Load the persisted graph of a template stack, starting empty when there is none or it is unreadable."""
+        path = graph_path(graph_dir, src_root) if graph_dir is not None else None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8")) if path is not None else {}
+            nodes = {name: TemplateNode(**node) for name, node in data["nodes"].items()} \
+                if data.get("version") == GRAPH_VERSION else {}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            nodes = {}
+        return cls(path, nodes)
+
+    def refresh(self, env: Environment, plan: list[RenderPlan]) -> None:
+        """
+        Bring the graph up to date with the plan's templates, re-parsing only those whose content changed.
+        Args:
+            env: The environment the plan renders with, whose loader names the templates.
+            plan: The render plan; its verbatim entries are ignored.
+        Returns: None
+        """
+        names = {item.source: template_name(env, item.source) for item in plan if item.is_template}
+        nodes = {}
+        for source, name in names.items():
+            count_filesystem_call("stat")
+            stat = source.stat()
+            node = self.nodes.get(name)
+            if node is None or (node.mtime_ns, node.size) != (stat.st_mtime_ns, stat.st_size):
+                node = self.reparse(env, name, source, stat, node)
+            nodes[name] = node
+
+        self.changed = self.changed or nodes != self.nodes
+        self.nodes = nodes
+        self.names = names
+        self._closures = {}
+
+    def reparse(self, env: Environment, name: str, source: Path, stat: os.stat_result,
+                node: TemplateNode | None) -> TemplateNode:
+        """Parse a template whose signature changed, unless its content turns out to be the same."""
+        count_filesystem_call("read")
+        content = source.read_bytes()
+        if node is not None and node.digest == bytes_digest(content):
+            return TemplateNode(stat.st_mtime_ns, stat.st_size, node.digest, node.references, node.variables,
+                                node.dynamic)
+        return parse_template(env, name, content, stat)
+
+    def closure(self, name: str) -> frozenset[str] | None:
+        """Return a template and every template it references, directly or not, or None when that cannot be known."""
+        if name not in self._closures:
+            seen = {name}
+            pending = [name]
+            while pending:
+                node = self.nodes.get(pending.pop())
+                if node is None or node.dynamic:
+                    self._closures[name] = None
+                    return None
+                for reference in node.references:
+                    if reference not in seen:
+                        seen.add(reference)
+                        pending.append(reference)
+            self._closures[name] = frozenset(seen)
+        return self._closures[name]
+
+    def variables(self, name: str) -> list[str] | None:
+        """Return the variables a template's output reads through its whole closure, or None when unknown."""
+        closure = self.closure(name)
+        if closure is None:
+            return None
+        return sorted({variable for member in closure for variable in self.nodes[member].variables})
+
+    def fingerprint(self, name: str, context: dict) -> str | None:
+        """Hash everything a template's output depends on, or None when its inputs cannot be known."""
+        closure = self.closure(name)
+        variables = self.variables(name)
+        if closure is None or variables is None:
+            return None
+
+        inputs = {
+            "templates": {member: self.nodes[member].digest for member in sorted(closure)},
+            "context": {variable: context.get(variable) for variable in variables},
+        }
+        return bytes_digest(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8"))
+
+    def fingerprints(self, plan: list[RenderPlan], context: dict) -> dict[Path, str]:
+        """Return the inputs fingerprint of every template output in the plan whose inputs can be known."""
+        fingerprints = {}
+        for item in plan:
+            name = self.names.get(item.source)
+            fingerprint = self.fingerprint(name, context) if name is not None else None
+            if fingerprint is not None:
+                fingerprints[item.target] = fingerprint
+        return fingerprints
+
+    def context_keys(self, context: dict) -> dict[str, tuple[str, ...] | None]:
+        """Classify every template by the context keys its output depends on, None meaning it cannot be known.
+
+        A template reading no keys renders the same for every project, and one reading only `date` the same for
+        every project rendered that day.
+        """
+        keys = {}
+        for name in sorted(self.nodes):
+            variables = self.variables(name)
+            keys[name] = None if variables is None else tuple(key for key in variables if key in context)
+        return keys
+
+    def dependents(self, names: set[str]) -> set[str]:
+        """Return the templates whose output may depend on any of the named templates, including those templates."""
+        return {name for name in self.nodes
+                if (closure := self.closure(name)) is None or not closure.isdisjoint(names)}
+
+    def save(self) -> None:
+        """Persist the graph if it changed, replacing any previous one atomically."""
+        if self.path is None or not self.changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        staging = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        data = {"version": GRAPH_VERSION, "nodes": {name: asdict(node) for name, node in self.nodes.items()}}
+        staging.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(staging, self.path)
+        self.changed = False
@@ -0,0 +1,97 @@
+"""
+Previews of what applying a render plan would change, without writing anything.
+
+Every template is rendered in memory on the apply engine's workers, and each target is classified with the same
+checks apply_plan uses: a missing target is new, a recorded digest or a size mismatch settles most of the rest, and
+only same-sized files are hashed. Text diffs are computed only for targets that are new or changed.
+"""
+import difflib
+import json
+from pathlib import Path
+
+import click
+from jinja2 import Environment
+
+from generation.apply import PlanOutputs, TargetStatus, ordered_map, target_status
+from generation.digests import DigestManifest
+from generation.render import RenderPlan
+from generation.render_processes import render_in_processes
+
+NO_NEWLINE_MARKER = "\\ No newline at end of file\n"
+
+
+def classify_plan(env: Environment, plan: list[RenderPlan], context: dict, workers: int, render_processes: bool,
+                  digests: DigestManifest | None) -> tuple[PlanOutputs, list[TargetStatus]]:
+    """Render the plan in memory and classify every target, in plan order."""
+    rendered = render_in_processes(env, plan, context, workers) if render_processes else {}
+    outputs = PlanOutputs(env, context, rendered)
+    statuses = list(ordered_map(lambda item: target_status(item, outputs, digests), plan, workers))
+    return outputs, statuses
+
+
+def new_content(item: RenderPlan, outputs: PlanOutputs) -> bytes:
+    """Return the bytes applying the entry would leave at its target."""
+    return outputs.content(item) if item.is_template else item.source.read_bytes()
+
+
+def text_lines(content: bytes) -> list[str] | None:
+    """Split content into lines for diffing, or None when it is binary: not UTF-8, or containing NUL as git checks."""
+    if b"\0" in content:
+        return None
+    try:
+        return content.decode("utf-8").splitlines(keepends=True)
+    except UnicodeDecodeError:
+        return None
+
+
+def unified_diff(item: RenderPlan, outputs: PlanOutputs, status: TargetStatus, relative: str) -> str:
+    """Render the unified diff of one new or changed target, marking binary files as git does."""
+    before = b"" if status is TargetStatus.NEW else item.target.read_bytes()
+    old_lines, new_lines = text_lines(before), text_lines(new_content(item, outputs))
+    old_name = "/dev/null" if status is TargetStatus.NEW else f"a/{relative}"
+    if old_lines is None or new_lines is None:
+        return f"Binary files {old_name} and b/{relative} differ\n"
+
+    lines = difflib.unified_diff(old_lines, new_lines, fromfile=old_name, tofile=f"b/{relative}")
+    return "".join(line if line.endswith("\n") else f"{line}\n{NO_NEWLINE_MARKER}" for line in lines)
+
+
+def change_summary(changes: list[tuple[str, TargetStatus]]) -> dict:
+    """Summarize the classified targets as a JSON-serializable dict."""
+    counts = {status.value: 0 for status in TargetStatus}
+    for _, status in changes:
+        counts[status.value] += 1
+    files = [{"path": relative, "status": status.value}
+             for relative, status in changes if status is not TargetStatus.UNCHANGED]
+    return {"summary": counts, "files": files}
+
+
+def preview_changes(env: Environment, plan: list[RenderPlan], dest_root: Path, context: dict, diff_format: str,
+                    workers: int = 1, render_processes: bool = False, digests: DigestManifest | None = None) -> None:
+    """
+    Print what applying the plan would change in the destination, without writing to it.
+    Args:
+        env: The Jinja environment to render with.
+        plan: The render plan, built against `dest_root`.
+        dest_root: The destination directory, which paths are reported relative to.
+        context: The context dict to pass to the templates.
+        diff_format: "unified" for diffs of every new or changed file, or "json" for a change summary.
+        workers: The number of threads (or processes, for renders) used to render and compare.
+        render_processes: Whether to render templates in worker processes instead of threads.
+        digests: The destination's digest manifest, letting recorded targets skip hashing. It is not saved.
+    Returns: None
+    """
+    outputs, statuses = classify_plan(env, plan, context, workers, render_processes, digests)
+    changes = [(item.target.relative_to(dest_root).as_posix(), status) for item, status in zip(plan, statuses)]
+
+    if diff_format == "json":
+        click.echo(json.dumps(change_summary(changes), indent=2))
+        return
+
+    differing = [(item, status, relative) for item, (relative, status) in zip(plan, changes)
+                 if status is not TargetStatus.UNCHANGED]
+    for diff in ordered_map(lambda entry: unified_diff(entry[0], outputs, entry[1], entry[2]), differing, workers):
+        click.echo(diff, nl=False)
+
+    counts = change_summary(changes)["summary"]
+    click.echo(f"{counts['new']} new, {counts['changed']} changed, {counts['unchanged']} unchanged", err=True)
@@ -0,0 +1,88 @@
+"""
+Digest manifest recording what the generator last wrote into a destination.
+
+A target whose size and mtime still match the manifest, and whose recorded digest matches the new output,
+is known to be unchanged without reading it. Template outputs may also record the inputs fingerprint they were
+rendered from (see generation.dependencies), which lets an untouched output with the same inputs skip rendering too.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_NAME = ".generation-digests.json"
+CHUNK_SIZE = 1024 * 1024
+
+
+def bytes_digest(content: bytes) -> str:
+    """Return the SHA-256 hex digest of in-memory content."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def streaming_digest() -> "hashlib._Hash":
+    """Return a hash object that produces the same digests as bytes_digest, for content seen in chunks."""
+    return hashlib.sha256()
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = streaming_digest()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DigestManifest:
+    """Maps destination-relative paths to the digest, size, mtime and, optionally, inputs fingerprint of the file
+    last written there."""
+
+    def __init__(self, root: Path, entries: dict[str, list]) -> None:
+        self.root = root
+        self.entries = entries
+
+    @classmethod
+    def load(cls, root: Path) -> "DigestManifest":
+        """Load the manifest stored in the root, starting empty when it is missing or unreadable."""
+        try:
+            entries = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entries = {}
+        return cls(root, entries if isinstance(entries, dict) else {})
+
+    def key(self, target: Path) -> str | None:
+        """Return the manifest key for a target, or None when it lies outside the root."""
+        try:
+            return target.relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def matches(self, target: Path, digest: str, stat: os.stat_result) -> bool:
+        """Whether the target is recorded with this digest and has not been touched since."""
+        entry = self.entries.get(self.key(target))
+        return entry is not None and entry[:3] == [digest, stat.st_size, stat.st_mtime_ns]
+
+    def inputs_match(self, target: Path, inputs: str, stat: os.stat_result) -> bool:
+        """Whether the target was rendered from inputs with this fingerprint and has not been touched since."""
+        entry = self.entries.get(self.key(target))
+        return entry is not None and entry[1:] == [stat.st_size, stat.st_mtime_ns, inputs]
+
+    def inputs_recorded(self, target: Path, inputs: str | None) -> bool:
+        """Whether the target is recorded as rendered from inputs with this fingerprint, without checking the file."""
+        entry = self.entries.get(self.key(target))
+        return inputs is not None and entry is not None and entry[3:] == [inputs]
+
+    def record(self, target: Path, digest: str, inputs: str | None = None, stat: os.stat_result | None = None) -> None:
+        """Record the digest of a file, along with its size and mtime and the fingerprint of its inputs, if known."""
+        key = self.key(target)
+        if key is None:
+            return
+        stat = target.stat() if stat is None else stat
+        self.entries[key] = [digest, stat.st_size, stat.st_mtime_ns] + ([inputs] if inputs is not None else [])
+
+    def save(self) -> None:
+        """Atomically write the manifest back into the root."""
+        path = self.root / MANIFEST_NAME
+        staging = path.with_name(f"{MANIFEST_NAME}.tmp")
+        staging.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(staging, path)
@@ -0,0 +1,154 @@
+"""
+Rendering without touching the destination filesystem.
+
+Templates can be rendered into an in-memory mapping of path to bytes, or streamed straight from the render loop
+into a tar, tar.gz or zip archive on disk or stdout. Verbatim files keep their source mode and mtime, as copy2 does,
+and rendered templates get the mode a freshly written file would have.
+"""
+import io
+import os
+import shutil
+import stat
+import tarfile
+import time
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+import click
+from jinja2 import Environment
+
+from generation.apply import render_bytes
+from generation.caches import CacheLocations
+from generation.options import STDOUT_ARCHIVE
+from generation.render import RenderPlan, TemplateSource, build_render_plan, shared_jinja_env
+
+ZIP_EPOCH = 315532800  # 1980-01-01, the earliest timestamp a zip entry can hold
+
+
+@dataclass(frozen=True)
+class RenderedFile:
+    """A single output file, either rendered into memory or read on demand from its verbatim source.
+
+    Attributes:
+        path: The POSIX path of the file relative to the output root
+        mode: The permission bits the file is written with
+        mtime: The modification time the file is written with
+        size: The number of bytes in the file
+        content: The rendered bytes, for templates
+        source: The file to copy from, for verbatim files
+    """
+    path: str
+    mode: int
+    mtime: float
+    size: int
+    content: bytes | None = None
+    source: Path | None = None
+
+    def open(self) -> BinaryIO:
+        """Open the file's bytes for reading."""
+        return io.BytesIO(self.content) if self.content is not None else self.source.open("rb")
+
+    def read(self) -> bytes:
+        with self.open() as handle:
+            return handle.read()
+
+
+def new_file_mode() -> int:
+    """Return the permission bits a newly written file gets under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def rendered_files(env: Environment, plan: Iterable[RenderPlan], context: dict) -> Iterator[RenderedFile]:
+    """Yield each output of a plan built against a relative destination, rendering templates one at a time."""
+    template_mode = new_file_mode()
+    for item in plan:
+        if item.is_template:
+            content = render_bytes(env, item, context)
+            yield RenderedFile(path=item.target.as_posix(), mode=template_mode, mtime=time.time(),
+                               size=len(content), content=content)
+            continue
+
+        source_stat = item.source.stat()
+        yield RenderedFile(path=item.target.as_posix(), mode=stat.S_IMODE(source_stat.st_mode),
+                           mtime=source_stat.st_mtime, size=source_stat.st_size, source=item.source)
+
+
+def render_to_memory(src_root: TemplateSource, context: dict,
+                     caches: CacheLocations = CacheLocations()) -> dict[str, bytes]:
+    """
+    Render a template into memory without touching disk.
+    Args:
+        src_root: The template directory to render, or a stack of layers from the base one to the top one.
+        context: The context dict to pass to the templates.
+        caches: Where the bytecode cache and template tree index live; none by default.
+    Returns: The content of every output file, keyed by its POSIX path relative to the output root.
+    """
+    env = shared_jinja_env(src_root, caches.bytecode)
+    plan = build_render_plan(src_root, Path(), caches.plans)
+    return {file.path: file.read() for file in rendered_files(env, plan, context)}
+
+
+def archive_format_for(destination: str, requested: str | None) -> str:
+    """Return the requested archive format, or infer it from the destination's suffix, defaulting to tar."""
+    if requested is not None:
+        return requested
+
+    name = destination.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    return "tar"
+
+
+def write_tar(files: Iterable[RenderedFile], stream: BinaryIO, compressed: bool) -> int:
+    """Stream files into a tar archive, returning how many were written."""
+    count = 0
+    with tarfile.open(fileobj=stream, mode="w|gz" if compressed else "w|") as archive:
+        for file in files:
+            info = tarfile.TarInfo(file.path)
+            info.size, info.mode, info.mtime = file.size, file.mode, int(file.mtime)
+            with file.open() as handle:
+                archive.addfile(info, handle)
+            count += 1
+    return count
+
+
+def write_zip(files: Iterable[RenderedFile], stream: BinaryIO) -> int:
+    """Stream files into a zip archive, returning how many were written."""
+    count = 0
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for file in files:
+            info = zipfile.ZipInfo(file.path, date_time=time.localtime(max(file.mtime, ZIP_EPOCH))[:6])
+            info.external_attr = (stat.S_IFREG | file.mode) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with file.open() as source, archive.open(info, "w", force_zip64=file.size > zipfile.ZIP64_LIMIT) as target:
+                shutil.copyfileobj(source, target)
+            count += 1
+    return count
+
+
+def write_archive(files: Iterable[RenderedFile], destination: str, archive_format: str) -> int:
+    """
+    Stream files into an archive as they are produced.
+    Args:
+        files: The files to archive, typically straight from rendered_files.
+        destination: The archive path, or "-" for stdout.
+        archive_format: One of "tar", "tar.gz" or "zip".
+    Returns: The number of files archived.
+    """
+    if destination == STDOUT_ARCHIVE:
+        return write_archive_stream(files, click.get_binary_stream("stdout"), archive_format)
+
+    with open(destination, "wb") as stream:
+        return write_archive_stream(files, stream, archive_format)
+
+
+def write_archive_stream(files: Iterable[RenderedFile], stream: BinaryIO, archive_format: str) -> int:
+    if archive_format == "zip":
+        return write_zip(files, stream)
+    return write_tar(files, stream, compressed=archive_format == "tar.gz")
@@ -0,0 +1,193 @@
+"""
+The initial git commit of a new project, built from the render output instead of from the files on disk.
+
+`git add -A && git commit` reads and hashes every file the generator has just written. Instead, `git fast-import`
+is started before rendering, and the apply engine hands it each file as a blob while writing it: small rendered
+outputs straight from memory, and larger files streamed back from the page cache in blocks. Once every file is
+written, a single commit referencing those blobs is streamed in, so git never walks or hashes the project itself.
+Pushing it is left to the caller to ask for, so generating a project works offline.
+"""
+import os
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import click
+
+from generation.digests import MANIFEST_NAME
+from generation.profiling import span
+
+BRANCH = "main"
+COMMIT_MESSAGE = "Initial commit"
+BLOB_BLOCK_BYTES = 256 * 1024  # size of the blocks a written file is streamed to fast-import in
+
+
+class GitSnapshot:
+    """A `git fast-import` process receiving the blobs of a destination's files as they are written."""
+
+    def __init__(self, dest_root: Path, ident: str) -> None:
+        self.dest_root = dest_root
+        self.ident = ident
+        self.entries: dict[str, tuple[int, str]] = {}  # relative POSIX path to blob mark and git file mode
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(["git", "fast-import", "--quiet"], cwd=dest_root, stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def add(self, target: Path, content: bytes, mode: int) -> None:
+        """
+        Stream a written file into the repository as a blob, to be committed at its path.
+        Args:
+            target: The file's path in the destination.
+            content: The bytes written to it.
+            mode: The file's permission bits, which decide whether git records it as executable.
+        Returns: None
+        """
+        self.add_blob(target, [content], len(content), mode)
+
+    def add_file(self, target: Path, path: Path) -> None:
+        """
+        Stream a written file into the repository as a blob, in blocks, so a large file is never held whole.
+        Args:
+            target: The file's path in the destination.
+            path: Where the file was written, which is the target unless it was staged elsewhere first.
+        Returns: None
+        """
+        with open(path, "rb") as handle:
+            stat = os.fstat(handle.fileno())
+            self.add_blob(target, iter(partial(handle.read, BLOB_BLOCK_BYTES), b""), stat.st_size, stat.st_mode)
+
+    def add_blob(self, target: Path, blocks: Iterable[bytes], size: int, mode: int) -> None:
+        """Send a blob of `size` bytes, made of the blocks, and remember it for the commit."""
+        relative = target.relative_to(self.dest_root).as_posix()
+        with self.lock:
+            mark = len(self.entries) + 1
+            self.send(b"blob\nmark :%d\ndata %d\n" % (mark, size))
+            for block in blocks:
+                self.send(block)
+            self.send(b"\n")
+            self.entries[relative] = (mark, "100755" if mode & 0o111 else "100644")
+
+    def send(self, *parts: bytes) -> None:
+        """Write to fast-import, reporting its error if it has stopped."""
+        try:
+            for part in parts:
+                self.process.stdin.write(part)  # type: ignore[union-attr]
+        except BrokenPipeError:
+            self.fail()
+
+    def commit(self) -> int:
+        """
+        Commit every blob that is not ignored by the project's .gitignore files to the main branch, and check it out.
+        Returns: The number of files committed.
+        """
+        ignored = ignored_paths(self.dest_root, list(self.entries))
+        paths = sorted(path for path in self.entries if path not in ignored)
+        message = COMMIT_MESSAGE.encode("utf-8")
+
+        commands = [b"commit refs/heads/%s\n" % BRANCH.encode("utf-8"),
+                    b"committer %s\n" % self.ident.encode("utf-8"),
+                    b"data %d\n%s\n" % (len(message), message)]
+        for path in paths:
+            mark, mode = self.entries[path]
+            commands.append(b"M %s :%d %s\n" % (mode.encode("ascii"), mark, quote_path(path).encode("utf-8")))
+        self.send(*commands)
+        self.process.stdin.close()  # type: ignore[union-attr]
+        if self.process.wait() != 0:
+            self.fail()
+
+        # The index is filled from the commit, so the work tree shows as clean
+        git_output(self.dest_root, "symbolic-ref", "HEAD", f"refs/heads/{BRANCH}")
+        git_output(self.dest_root, "read-tree", "HEAD")
+        return len(paths)
+
+    def abort(self) -> None:
+        """Stop fast-import without committing anything."""
+        self.process.kill()
+        self.process.wait()
+
+    def fail(self) -> None:
+        self.process.kill()
+        error = self.process.stderr.read().decode("utf-8", "replace").strip()  # type: ignore[union-attr]
+        raise click.ClickException(f"git fast-import failed: {error}")
+
+
+def quote_path(path: str) -> str:
+    """Quote a path for fast-import when it holds characters that would end or confuse the command."""
+    if '"' not in path and "\n" not in path and "\\" not in path:
+        return path
+    return '"' + path.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def git_output(cwd: Path, *arguments: str) -> str:
+    """Run a git command, returning its output, or raise its error for the user."""
+    result = subprocess.run(["git", *arguments], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise click.ClickException(f"git {arguments[0]} failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def ignored_paths(dest_root: Path, paths: list[str]) -> set[str]:
+    """Return the paths the destination's .gitignore files exclude, as `git add -A` would."""
+    result = subprocess.run(["git", "check-ignore", "--stdin", "-z"], cwd=dest_root, capture_output=True,
+                            input="\0".join(paths).encode("utf-8"))
+    # check-ignore exits with 1 when no path is ignored
+    if result.returncode not in (0, 1):
+        raise click.ClickException(f"git check-ignore failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return set(filter(None, result.stdout.decode("utf-8").split("\0")))
+
+
+def holds_only_generated_files(dest_root: Path) -> bool:
+    """Whether the destination is empty, apart from the generator's digest manifest."""
+    with os.scandir(dest_root) as entries:
+        return all(entry.name == MANIFEST_NAME for entry in entries)
+
+
+@contextmanager
+def initial_commit(dest_root: Path, remote_url: str, push: bool, enabled: bool = True) -> Iterator[GitSnapshot | None]:
+    """
+    Create a repository in a new project and commit the files written inside the block, straight from their bytes.
+    Args:
+        dest_root: The project directory.
+        remote_url: The URL added as the origin remote, if any.
+        push: Whether to push the commit to the origin remote.
+        enabled: Whether to make the commit at all.
+    Returns: The snapshot to pass to the apply engine, or None when no commit is made here. A destination that is
+    already a repository, or already holds files, is left to `task bootstrap` to commit, as is everything when git is
+    not installed.
+    """
+    if not enabled:
+        yield None
+        return
+    if shutil.which("git") is None or (dest_root / ".git").exists() or not holds_only_generated_files(dest_root):
+        click.echo("Leaving the initial commit to 'task bootstrap'")
+        yield None
+        return
+    if push and not remote_url:
+        raise click.ClickException("--push needs a remote URL to push to")
+
+    # Checked first, so a missing identity fails before anything is rendered, as `git commit` would fail on it
+    ident = git_output(dest_root, "var", "GIT_COMMITTER_IDENT")
+    git_output(dest_root, "init", "--quiet")
+    snapshot = GitSnapshot(dest_root, ident)
+    try:
+        yield snapshot
+    except BaseException:
+        snapshot.abort()
+        raise
+
+    started = time.perf_counter()
+    with span("git_commit", "phase"):
+        count = snapshot.commit()
+        if remote_url:
+            git_output(dest_root, "remote", "add", "origin", remote_url)
+    click.echo(f"Committed {count} files to {BRANCH} in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    if push:
+        with span("git_push", "phase"):
+            git_output(dest_root, "push", "--quiet", "-u", "origin", BRANCH)
+        click.echo(f"Pushed {BRANCH} to {remote_url}")
@@ -0,0 +1,51 @@
+"""
+A click group whose subcommands can be imported only when they are used.
+"""
+import importlib
+
+import click
+
+
+def load_command(import_path: str) -> click.Command:
+    """Import a command given as "package.module:attribute"."""
+    module_name, attribute = import_path.split(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class LazyGroup(click.Group):
+    """A group that also holds commands by import path, importing each the first time it is looked up.
+
+    The group's help lists lazy commands with the short help given alongside their import path,
+    so --help imports none of them.
+    """
+
+    def __init__(self, *args, lazy_commands: dict[str, tuple[str, str]] | None = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, name: str) -> click.Command | None:
+        command = super().get_command(ctx, name)
+        if command is None and name in self.lazy_commands:
+            command = load_command(self.lazy_commands[name][0])
+            self.add_command(command, name)
+        return command
+
+    def command_summary(self, name: str, limit: int) -> str | None:
+        """Return a command's short help without importing it, or None for hidden commands."""
+        command = self.commands.get(name)
+        if command is None:
+            return self.lazy_commands[name][1]
+        return None if command.hidden else command.get_short_help_str(limit)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        names = self.list_commands(ctx)
+        if not names:
+            return
+
+        limit = formatter.width - 6 - max(len(name) for name in names)
+        rows = [(name, help_text) for name in names if (help_text := self.command_summary(name, limit)) is not None]
+        with formatter.section("Commands"):
+            formatter.write_dl(rows)
@@ -0,0 +1,10 @@
+"""
+Choices shared by the CLI's option declarations and the modules that implement them.
+
+Kept free of imports so the CLI can declare every option without loading the render pipeline.
+"""
+
+ARCHIVE_FORMATS = ("tar", "tar.gz", "zip")
+STDOUT_ARCHIVE = "-"
+COPY_MODES = ("auto", "reflink", "hardlink", "copy")
+DIFF_FORMATS = ("unified", "json")
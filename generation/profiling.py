@@ -0,0 +1,173 @@
+"""
+Per-phase profiling and Chrome trace output.
+
+Instrumented code asks for the active profiler, which is None unless a profiling session is running, so the disabled
+path costs one global lookup per instrumented call. An active profiler records:
+- a span for each phase and for each template compile and render, on the thread that ran it
+- the number of bytes written
+- the number of filesystem calls, by kind
+
+A session prints a human summary to stderr and can write the spans as a Chrome trace (chrome://tracing, Perfetto).
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator, TypeVar
+
+import click
+
+SLOWEST_TEMPLATES = 10
+
+Function = TypeVar("Function", bound=Callable)
+
+_active: "Profiler | None" = None
+
+
+@dataclass(frozen=True)
+class Span:
+    """A timed region of work.
+
+    Attributes:
+        name: What ran, such as a phase or template name
+        category: The kind of work, such as "phase", "compile" or "render"
+        start: perf_counter seconds when the span started
+        duration: Seconds the span lasted
+        thread: The identifier of the thread that ran it
+    """
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread: int
+
+
+class Profiler:
+    """Collects spans and counters from any thread."""
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self.filesystem_calls: Counter[str] = Counter()
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            span = Span(name, category, started, time.perf_counter() - started, threading.get_ident())
+            with self.lock:
+                self.spans.append(span)
+
+    def count_filesystem_call(self, kind: str) -> None:
+        with self.lock:
+            self.filesystem_calls[kind] += 1
+
+    def add_bytes_written(self, count: int) -> None:
+        with self.lock:
+            self.bytes_written += count
+
+    def chrome_trace(self) -> dict:
+        """Return the spans in Chrome's trace event format, with the counters as metadata."""
+        events = [{
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": (span.start - self.origin) * 1_000_000,
+            "dur": span.duration * 1_000_000,
+            "pid": os.getpid(),
+            "tid": span.thread,
+        } for span in self.spans]
+        metadata = {"bytes_written": self.bytes_written, "filesystem_calls": dict(self.filesystem_calls)}
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata}
+
+    def summary(self) -> list[str]:
+        """Return the human-readable summary lines."""
+        lines = ["Profile:"]
+        phases = sorted((span for span in self.spans if span.category == "phase"), key=lambda span: span.start)
+        lines += [f"  {span.name}: {span.duration * 1000:.1f} ms" for span in phases]
+
+        per_template: dict[str, dict[str, float]] = defaultdict(lambda: {"compile": 0.0, "render": 0.0})
+        for span in self.spans:
+            if span.category in ("compile", "render"):
+                per_template[span.name][span.category] += span.duration
+        slowest = sorted(per_template.items(), key=lambda entry: -sum(entry[1].values()))[:SLOWEST_TEMPLATES]
+        if slowest:
+            lines.append("  Slowest templates (compile / render):")
+            lines += [f"    {name}: {times['compile'] * 1000:.2f} / {times['render'] * 1000:.2f} ms"
+                      for name, times in slowest]
+
+        calls = ", ".join(f"{kind} {count}" for kind, count in sorted(self.filesystem_calls.items()))
+        lines.append(f"  Bytes written: {self.bytes_written}")
+        lines.append(f"  Filesystem calls: {calls or 'none'}")
+        return lines
+
+
+def active_profiler() -> Profiler | None:
+    return _active
+
+
+def span(name: str, category: str) -> ContextManager[None]:
+    """Time a region when profiling, otherwise do nothing."""
+    return _active.span(name, category) if _active is not None else nullcontext()
+
+
+def count_filesystem_call(kind: str) -> None:
+    if _active is not None:
+        _active.count_filesystem_call(kind)
+
+
+def add_bytes_written(count: int) -> None:
+    if _active is not None:
+        _active.add_bytes_written(count)
+
+
+def phase(function: Function) -> Function:
+    """Record every call of the decorated function as a phase span named after it, when profiling."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if _active is None:
+            return function(*args, **kwargs)
+        with _active.span(function.__name__, "phase"):
+            return function(*args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+@contextmanager
+def profiling_session(show_summary: bool, trace_file: Path | None) -> Iterator[None]:
+    """
+    Profile everything run inside the block, if requested.
+    Args:
+        show_summary: Whether to print the summary to stderr afterwards.
+        trace_file: Where to write a Chrome trace afterwards, if anywhere.
+    Returns: A context manager.
+    """
+    global _active
+    if not show_summary and trace_file is None:
+        yield
+        return
+
+    _active = Profiler()
+    try:
+        yield
+    finally:
+        profiler, _active = _active, None
+        report(profiler, show_summary, trace_file)
+
+
+def report(profiler: Profiler, show_summary: bool, trace_file: Path | None) -> None:
+    if show_summary:
+        for line in profiler.summary():
+            click.echo(line, err=True)
+    if trace_file is not None:
+        trace_file.write_text(json.dumps(profiler.chrome_trace()), encoding="utf-8")
+        click.echo(f"Trace written to {trace_file}", err=True)
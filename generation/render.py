@@ -0,0 +1,219 @@
+"""
+Core rendering pipeline shared by every CLI command.
+
+Resolves template roots, builds render plans, and applies them to destination directories.
+Kept free of command-line parsing so that batch workers can import it directly.
+"""
+import subprocess
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import click
+from jinja2 import BytecodeCache, Environment, FileSystemLoader, StrictUndefined
+
+from generation.bytecode_cache import open_bytecode_cache
+from generation.profiling import phase
+from generation.template_index import overlay_template_files, scan_overlay_files
+
+# A template root, or a stack of template roots from the base layer to the top one.
+TemplateSource = Path | tuple[Path, ...]
+
+# Settings of every environment templates are rendered with, including those loading precompiled bundles.
+ENVIRONMENT_OPTIONS = dict(
+    undefined=StrictUndefined,  # error on missing variables to catch mismatches early
+    autoescape=False,
+    keep_trailing_newline=True,
+    lstrip_blocks=False,
+    trim_blocks=False,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class RenderPlan:
+    """Represents a single file render/copy action.
+
+    Slotted, as streamed plans of huge template trees create one per file.
+
+    Attributes:
+        source: The source file in the templates tree
+        target: The destination file path in the output tree
+        is_template: Whether the source has a .j2 suffix and should be rendered
+    """
+    source: Path
+    target: Path
+    is_template: bool
+
+
+def find_repo_root(start: Path) -> Path:
+    """Ascend from the start until a directory containing 'templates' exists.
+
+    This keeps the CLI resilient to being run from different working directories,
+    but still within the repository checked out. If not found, falls back to start.
+    """
+    cur = start.resolve()
+    for _ in range(10):  # safeguard to avoid walking the whole drive
+        if (cur / "templates").is_dir():
+            return cur
+        nxt = cur.parent
+        if nxt == cur:
+            break
+        cur = nxt
+    return start.resolve()
+
+
+def template_root(repo_root: Path, template: str) -> Path:
+    """Return the path to the template directory, validating it exists."""
+    root = repo_root / "templates" / template
+    if not root.is_dir():
+        raise click.ClickException(f"Template '{template}' not found at {root}")
+    return root
+
+
+def template_layers(repo_root: Path, templates: Iterable[str]) -> tuple[Path, ...]:
+    """Return the directories of stacked templates, from the base layer to the top one, validating each exists."""
+    layers = tuple(template_root(repo_root, template) for template in templates)
+    if not layers:
+        raise click.ClickException("At least one template is required")
+    return layers
+
+
+def as_layers(src_root: TemplateSource) -> tuple[Path, ...]:
+    """Return a template source as a tuple of absolute layers, a single root being a stack of one.
+
+    Layers are resolved so the loader's search path and the plan's sources agree, as template_name relies on.
+    """
+    layers = (src_root,) if isinstance(src_root, Path) else tuple(src_root)
+    return tuple(layer.resolve() for layer in layers)
+
+
+@phase
+def build_render_plan(src_root: TemplateSource, dest_root: Path, index_dir: Path | None = None) -> list[RenderPlan]:
+    """Walk the template tree and produce a render plan for all files.
+
+    - .j2 files are rendered, and the .j2 suffix is removed at destination.
+    - Other files are copied verbatim.
+    - Skips Python cache artifacts (e.g., __pycache__/ and *.pyc) without descending into them.
+    - Directories are mirrored implicitly by ensuring parent dirs exist during application.
+    - When `index_dir` is given, an unchanged template tree is loaded from its index instead of walked.
+    - With several layers, a file in a later layer replaces the file with the same output path in earlier ones.
+    """
+    return [plan_entry(layer, relative, dest_root)
+            for layer, relative in overlay_template_files(as_layers(src_root), index_dir)]
+
+
+def stream_render_plan(src_root: TemplateSource, dest_root: Path) -> Iterator[RenderPlan]:
+    """Yield the render plan entry of each file as the template tree is scanned, instead of building the plan first.
+
+    Files follow the same rules as build_render_plan, but layers are scanned from the top one down and the plan
+    index is not used, as it would have to hold the whole tree.
+    """
+    for layer, relative in scan_overlay_files(as_layers(src_root)):
+        yield plan_entry(layer, relative, dest_root)
+
+
+def plan_entry(layer: Path, relative: str, dest_root: Path) -> RenderPlan:
+    """Return the plan entry of a template file: rendered without its .j2 suffix, or copied as it is."""
+    rel = Path(relative)
+    is_tmpl = rel.suffix == ".j2"
+    target_rel = rel.with_suffix("") if is_tmpl else rel
+    return RenderPlan(source=layer / rel, target=dest_root / target_rel, is_template=is_tmpl)
+
+
+def relocate_plan(plan: Iterable[RenderPlan], dest_root: Path) -> list[RenderPlan]:
+    """Re-root a plan built against a relative destination onto a concrete destination directory.
+
+    This lets a single walk of the template tree be reused for any number of destinations.
+    """
+    return [RenderPlan(source=item.source, target=dest_root / item.target, is_template=item.is_template)
+            for item in plan]
+
+
+def ensure_destination_for_new(dest: Path) -> None:
+    """Ensure destination directory exists for 'new' command.
+
+    Creates the directory if missing; raises if a non-directory exists.
+    """
+    if dest.exists() and not dest.is_dir():
+        raise click.ClickException(f"Destination path exists and is not a directory: {dest}")
+    dest.mkdir(parents=True, exist_ok=True)
+
+
+def jinja_env(root: TemplateSource, bytecode_cache: BytecodeCache | None = None) -> Environment:
+    """Create a strict Jinja2 environment rooted at the given template directory, or stack of them.
+
+    Layers are searched from the top one down, so includes, imports and extends resolve across every layer
+    to the same file the render plan would pick. When a bytecode cache is given, compiled templates are loaded
+    from and saved to it.
+    """
+    return Environment(
+        loader=FileSystemLoader(list(reversed(as_layers(root)))),
+        bytecode_cache=bytecode_cache,
+        **ENVIRONMENT_OPTIONS,
+    )
+
+
+@lru_cache(maxsize=16)
+def shared_jinja_env(root: TemplateSource, cache_dir: Path | None) -> Environment:
+    """Return an environment for the template root that is reused for the life of the process.
+
+    Jinja's auto-reload recompiles any template whose file has changed since it was loaded,
+    so long-lived processes such as the server always render current templates.
+    """
+    return jinja_env(root, open_bytecode_cache(cache_dir))
+
+
+def env_layers(env: Environment) -> tuple[Path, ...]:
+    """Return the template layers an environment built by jinja_env loads from, from the base layer to the top one."""
+    return tuple(Path(path) for path in reversed(env.loader.searchpath))  # type: ignore[attr-defined]
+
+
+def template_name(env: Environment, source: Path) -> str:
+    """Convert an absolute template path into the loader-relative POSIX name Jinja expects."""
+    # The loader is configured at the template layers, so compute the path relative to the one holding the source
+    resolved = source.resolve()
+    for loader_root in env.loader.searchpath:  # type: ignore[attr-defined]
+        try:
+            return resolved.relative_to(loader_root).as_posix()
+        except ValueError:
+            continue
+    raise ValueError(f"{source} is not in any template layer")
+
+
+def normalize_context(
+        project_name: str,
+        repo_name: str,
+        author: str,
+        repo_url: str,
+        repo_remote_url: str,
+        repo_docs_url: str,
+        contact_email: str,
+        security_email: str,
+) -> dict:
+    """Build the context dict passed to templates, ensuring all expected keys exist.
+
+    The templates currently reference: project_name, repo_name, repo_url, author.
+    We also include repo_remote_url even if not used, to future-proof templates.
+    """
+    return {
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "project_name": project_name,
+        "repo_name": repo_name if len(repo_name.strip()) < 0 else project_name,
+        "author": author,
+        "repo_url": repo_url,
+        "repo_remote_url": repo_remote_url,
+        "repo_docs_url": repo_docs_url,
+        "contact_email": contact_email,
+        "security_email": security_email,
+    }
+
+
+@phase
+def run_bootstrap_task(dest_path: Path) -> None:
+    task_boostrap_command = [
+        "task",
+        "bootstrap",
+    ]
+    subprocess.check_call(task_boostrap_command, cwd=dest_path)
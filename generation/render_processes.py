@@ -0,0 +1,49 @@
+"""
+Rendering templates on a process pool, for templates heavy enough that threads would contend for the interpreter.
+
+Each process builds its own Jinja environment once, over the same template layers and bytecode cache as the
+caller's, and the rendered text is sent back to be written by the apply engine.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from jinja2 import Environment
+
+from generation.bytecode_cache import open_bytecode_cache
+from generation.profiling import phase
+from generation.render import RenderPlan, env_layers, jinja_env, template_name
+
+# Per-process environment for rendering templates in a process pool.
+_process_env: Environment | None = None
+
+
+@phase
+def render_in_processes(env: Environment, plan: list[RenderPlan], context: dict, workers: int) -> dict[Path, str]:
+    """Render every template in the plan on a process pool, for CPU-heavy templates.
+
+    Each process builds its own environment sharing the template layers and bytecode cache of `env`.
+    """
+    templates = [item for item in plan if item.is_template]
+    if not templates:
+        return {}
+
+    layers = env_layers(env)
+    cache_dir = getattr(env.bytecode_cache, "cache_dir", None)
+    names = [template_name(env, item.source) for item in templates]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=prepare_render_process,
+                             initargs=(layers, cache_dir)) as pool:
+        texts = pool.map(render_in_process, names, repeat(context))
+        return {item.target: text for item, text in zip(templates, texts)}
+
+
+def prepare_render_process(layers: tuple[Path, ...], cache_dir: Path | None) -> None:
+    """Build the environment this render process uses for every template."""
+    global _process_env
+    _process_env = jinja_env(layers, open_bytecode_cache(cache_dir))
+
+
+def render_in_process(name: str, context: dict) -> str:
+    """Render one template with the environment built by prepare_render_process."""
+    return _process_env.get_template(name).render(**context)
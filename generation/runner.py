@@ -0,0 +1,176 @@
+"""
+Runs the render pipeline for the CLI commands.
+
+Kept apart from the click declarations in __main__.py, which import this module only once a command actually renders,
+so --help, --version and argument errors never load Jinja or the apply engine.
+"""
+from pathlib import Path
+
+import click
+
+from generation.apply import ApplyOptions, apply_plan
+from generation.bundle import Bundle, BundleFiles, pack_templates
+from generation.caches import cache_locations
+from generation.dependencies import DependencyGraph
+from generation.diff import preview_changes
+from generation.digests import DigestManifest
+from generation.export import archive_format_for, rendered_files, write_archive
+from generation.git_commit import GitSnapshot
+from generation.options import STDOUT_ARCHIVE
+from generation.profiling import phase
+from generation.render import build_render_plan, find_repo_root, shared_jinja_env, stream_render_plan, template_layers
+from generation.streaming import stream_plan
+
+
+@phase
+def execute_render(template_names: tuple[str, ...], dest_path: Path, context: dict, dry_run: bool,
+                   always_overwrite: bool | None, use_cache: bool = True, workers: int = 1,
+                   render_processes: bool = False, copy_mode: str = "auto", staged: bool = False,
+                   bundle_path: Path | None = None, stream: bool = False, snapshot: GitSnapshot | None = None) -> None:
+    """
+    Common execution for both 'new' and 'add' commands: resolve paths, build plan, apply.
+    Args:
+        template_names: The templates to render, from the base layer to the top one.
+        dest_path: The path to the destination directory.
+        context: The context dict to pass to the template.
+        dry_run: Whether to just show the proposed changes without executing them.
+        always_overwrite: Whether to always overwrite existing files. None to prompt.
+        use_cache: Whether to use the on-disk bytecode cache and template tree index.
+        workers: The number of threads (or processes, for renders) used to apply the plan.
+        render_processes: Whether to render templates in worker processes instead of threads.
+        copy_mode: How verbatim files are copied; one of generation.options.COPY_MODES.
+        staged: Whether to stage every file beside the destination and commit them together, or write nothing.
+        bundle_path: A bundle made by `generation pack` to render from instead of the templates.
+        stream: Whether to write each file as the template tree is scanned, instead of planning the whole tree first.
+        snapshot: Where the files written are handed for the initial git commit, if one is made.
+    Returns: None
+    """
+    if stream:
+        stream_render(template_names, dest_path, context, dry_run, always_overwrite, use_cache, workers, copy_mode,
+                      snapshot)
+        return
+
+    files = None
+    if bundle_path is None:
+        repo_root = find_repo_root(Path.cwd())
+        src_root = template_layers(repo_root, template_names)
+
+        caches = cache_locations(repo_root, use_cache)
+
+        env = shared_jinja_env(src_root, caches.bytecode)
+        plan = build_render_plan(src_root, dest_path, caches.plans)
+
+        graph = DependencyGraph.load(caches.dependencies, src_root)
+        graph.refresh(env, plan)
+        graph.save()
+        fingerprints = graph.fingerprints(plan, context)
+    else:
+        bundle = Bundle(bundle_path)
+        env, plan, fingerprints, files = bundle.env, bundle.render_plan(dest_path), None, BundleFiles(bundle)
+
+    digests = DigestManifest.load(dest_path)
+
+    # Always confirm overwriting for safety in both commands
+    options = ApplyOptions(dry_run=dry_run, confirm_overwrite=always_overwrite is None,
+                           always_overwrite=always_overwrite if always_overwrite is not None else False,
+                           workers=workers, render_processes=render_processes, copy_mode=copy_mode,
+                           staged_root=dest_path if staged else None)
+    apply_plan(env, plan, context, options, digests=digests, fingerprints=fingerprints, files=files, snapshot=snapshot)
+
+    if not dry_run:
+        digests.save()
+
+
+def stream_render(template_names: tuple[str, ...], dest_path: Path, context: dict, dry_run: bool,
+                  always_overwrite: bool | None, use_cache: bool, workers: int, copy_mode: str,
+                  snapshot: GitSnapshot | None = None) -> None:
+    """
+    Render a template tree into the destination through the streaming pipeline of generation.streaming.stream_plan.
+    Only the bytecode cache is used: the plan index and the dependency graph both describe the whole tree, so
+    unchanged templates are recognised by rendering them and comparing digests.
+    Args:
+        template_names: The templates to render, from the base layer to the top one.
+        dest_path: The path to the destination directory.
+        context: The context dict to pass to the template.
+        dry_run: Whether to just show the proposed changes without executing them.
+        always_overwrite: Whether to always overwrite existing files. None to prompt.
+        use_cache: Whether to use the on-disk bytecode cache.
+        workers: The number of threads used to render and write files.
+        copy_mode: How verbatim files are copied; one of generation.options.COPY_MODES.
+        snapshot: Where the files written are handed for the initial git commit, if one is made.
+    Returns: None
+    """
+    repo_root = find_repo_root(Path.cwd())
+    src_root = template_layers(repo_root, template_names)
+    env = shared_jinja_env(src_root, cache_locations(repo_root, use_cache).bytecode)
+    digests = DigestManifest.load(dest_path)
+
+    options = ApplyOptions(dry_run=dry_run, confirm_overwrite=always_overwrite is None,
+                           always_overwrite=always_overwrite if always_overwrite is not None else False,
+                           workers=workers, copy_mode=copy_mode)
+    stream_plan(env, stream_render_plan(src_root, dest_path), context, options, digests=digests, snapshot=snapshot)
+
+    if not dry_run:
+        digests.save()
+
+
+def preview_render(template_names: tuple[str, ...], dest_path: Path, context: dict, diff_format: str, use_cache: bool = True,
+                   workers: int = 1, render_processes: bool = False) -> None:
+    """
+    Show what rendering a template into the destination would change, without writing anything.
+    Args:
+        template_names: The templates to render, from the base layer to the top one.
+        dest_path: The path to the destination directory.
+        context: The context dict to pass to the template.
+        diff_format: "unified" or "json"; see generation.diff.preview_changes.
+        use_cache: Whether to use the on-disk bytecode cache and template tree index.
+        workers: The number of threads (or processes, for renders) used to render and compare.
+        render_processes: Whether to render templates in worker processes instead of threads.
+    Returns: None
+    """
+    repo_root = find_repo_root(Path.cwd())
+    src_root = template_layers(repo_root, template_names)
+    caches = cache_locations(repo_root, use_cache)
+
+    env = shared_jinja_env(src_root, caches.bytecode)
+    plan = build_render_plan(src_root, dest_path, caches.plans)
+    preview_changes(env, plan, dest_path, context, diff_format, workers=workers, render_processes=render_processes,
+                    digests=DigestManifest.load(dest_path))
+
+
+def pack_bundle(template_names: tuple[str, ...], output: Path, use_cache: bool) -> None:
+    """
+    Pack templates into a bundle that new and add can render from with --bundle.
+    Args:
+        template_names: The templates to pack, from the base layer to the top one.
+        output: The bundle file to write.
+        use_cache: Whether to use the template tree index.
+    Returns: None
+    """
+    repo_root = find_repo_root(Path.cwd())
+    src_root = template_layers(repo_root, template_names)
+    count = pack_templates(src_root, output, cache_locations(repo_root, use_cache).plans)
+    click.echo(f"Packed {count} files into {output}")
+
+
+def export_archive(template_names: tuple[str, ...], context: dict, destination: str, archive_format: str | None,
+                   use_cache: bool) -> None:
+    """
+    Render a template straight into an archive without writing a project directory.
+    Args:
+        template_names: The templates to render, from the base layer to the top one.
+        context: The context dict to pass to the template.
+        destination: The archive path, or "-" for stdout.
+        archive_format: The archive format, or None to infer it from the destination.
+        use_cache: Whether to use the on-disk bytecode cache and template tree index.
+    Returns: None
+    """
+    repo_root = find_repo_root(Path.cwd())
+    src_root = template_layers(repo_root, template_names)
+    caches = cache_locations(repo_root, use_cache)
+
+    env = shared_jinja_env(src_root, caches.bytecode)
+    plan = build_render_plan(src_root, Path(), caches.plans)
+    count = write_archive(rendered_files(env, plan, context), destination, archive_format_for(destination, archive_format))
+
+    click.echo(f"Archived {count} files to {'stdout' if destination == STDOUT_ARCHIVE else destination}", err=True)
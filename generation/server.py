@@ -0,0 +1,242 @@
+"""
+Resident generation server.
+
+Keeps the CLI imported, along with its Jinja environments and template plans, in a long-lived process that listens
+on a Unix socket. A client sends its argument list together with its stdin, stdout and stderr file descriptors, and
+the server runs the command against those descriptors. Prompts, output and any subprocesses therefore behave exactly
+as they would in a local run, while the client only pays for a bare interpreter start.
+
+Messages are single lines of JSON:
+- {"op": "run", "argv": [...]} with three file descriptors attached, answered with {"exit_code": n}
+- {"op": "stats"}, answered with request-latency statistics
+- {"op": "stop"}, answered with {"stopped": true} before the server exits
+"""
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import click
+
+MAX_MESSAGE_BYTES = 1024 * 1024
+LATENCY_WINDOW = 1000
+STANDARD_STREAMS = (0, 1, 2)
+
+
+def server_socket_path(repo_root: Path) -> Path:
+    """Return the socket the server for this repository listens on. generate.py computes the same path."""
+    return repo_root / "generation" / ".cache" / "server.sock"
+
+
+def server_supported() -> bool:
+    """Whether this platform has Unix sockets with file descriptor passing."""
+    return hasattr(socket, "AF_UNIX") and hasattr(socket, "recv_fds")
+
+
+class LatencyStats:
+    """Rolling request latencies, in seconds, of the most recent requests."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.recent: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds: float) -> None:
+        self.total += 1
+        self.recent.append(seconds)
+
+    def summary(self) -> dict:
+        """Summarize the recent latencies in milliseconds."""
+        if not self.recent:
+            return {"requests": self.total}
+
+        ordered = sorted(self.recent)
+        return {
+            "requests": self.total,
+            "mean_ms": statistics.fmean(ordered) * 1000,
+            "p50_ms": ordered[len(ordered) // 2] * 1000,
+            "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+
+def read_message(connection: socket.socket) -> tuple[dict, list[int]]:
+    """Read one JSON line from the connection, along with any file descriptors sent with it."""
+    data, descriptors, _, _ = socket.recv_fds(connection, MAX_MESSAGE_BYTES, len(STANDARD_STREAMS))
+    while data and not data.endswith(b"\n") and len(data) < MAX_MESSAGE_BYTES:
+        chunk = connection.recv(MAX_MESSAGE_BYTES)
+        if not chunk:
+            break
+        data += chunk
+
+    try:
+        message = json.loads(data or b"{}")
+        if not isinstance(message, dict):
+            raise ValueError("Message is not an object")
+    except ValueError:
+        for descriptor in descriptors:
+            os.close(descriptor)
+        raise
+    return message, list(descriptors)
+
+
+def send_message(connection: socket.socket, message: dict) -> None:
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+@contextmanager
+def attached_streams(descriptors: list[int]) -> Iterator[None]:
+    """Point this process's standard streams at the client's descriptors for the duration of a request."""
+    saved_streams = sys.stdin, sys.stdout, sys.stderr
+    saved_descriptors = [os.dup(stream) for stream in STANDARD_STREAMS]
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    for stream, descriptor in zip(STANDARD_STREAMS, descriptors):
+        os.dup2(descriptor, stream)
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        sys.stdin, sys.stdout, sys.stderr = saved_streams
+        for stream, descriptor in zip(STANDARD_STREAMS, saved_descriptors):
+            os.dup2(descriptor, stream)
+            os.close(descriptor)
+
+
+def exit_code(code: object) -> int:
+    """Convert a SystemExit code into a process exit status."""
+    if code is None:
+        return 0
+    return code if isinstance(code, int) else 1
+
+
+def run_command(command: click.Command, argv: list[str]) -> int:
+    """Run the CLI with the given arguments and return its exit status."""
+    try:
+        command.main(args=argv, prog_name="generate.py", standalone_mode=True)
+    except SystemExit as e:
+        return exit_code(e.code)
+    except Exception:
+        # Report the failure to the client as a local run would, and keep serving
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+def handle_run(command: click.Command, message: dict, descriptors: list[int]) -> dict:
+    """Run a forwarded command against the client's standard streams."""
+    argv = message.get("argv")
+    if len(descriptors) != len(STANDARD_STREAMS) or not isinstance(argv, list):
+        return {"error": "A run request needs an argument list and three file descriptors"}
+    if argv[:1] == ["serve"]:
+        return {"error": "The server cannot run 'serve'"}
+
+    with attached_streams(descriptors):
+        return {"exit_code": run_command(command, [str(argument) for argument in argv])}
+
+
+def handle_connection(connection: socket.socket, command: click.Command, stats: LatencyStats) -> bool:
+    """Answer one client request. Returns False when the server was asked to stop."""
+    started = time.perf_counter()
+    message, descriptors = read_message(connection)
+    try:
+        operation = message.get("op")
+        if operation == "run":
+            send_message(connection, handle_run(command, message, descriptors))
+            stats.record(time.perf_counter() - started)
+        elif operation == "stats":
+            send_message(connection, stats.summary())
+        elif operation == "stop":
+            send_message(connection, {"stopped": True})
+            return False
+        else:
+            send_message(connection, {"error": f"Unknown operation: {operation}"})
+        return True
+    finally:
+        for descriptor in descriptors:
+            os.close(descriptor)
+
+
+def bind_server_socket(socket_path: Path) -> socket.socket:
+    """Bind the listening socket, replacing a stale one left by a server that did not exit cleanly."""
+    if request_server(socket_path, {"op": "stats"}) is not None:
+        raise click.ClickException(f"A server is already listening on {socket_path}")
+
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    socket_path.unlink(missing_ok=True)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Only the owner may run commands through the server, so the socket is created private rather than made so after
+    previous_umask = os.umask(0o077)
+    try:
+        listener.bind(str(socket_path))
+    finally:
+        os.umask(previous_umask)
+    os.chmod(socket_path, 0o600)
+    listener.listen()
+    return listener
+
+
+def serve_forever(socket_path: Path, command: click.Command) -> None:
+    """
+    Serve requests one at a time until asked to stop or interrupted.
+    Args:
+        socket_path: The Unix socket to listen on.
+        command: The CLI that forwarded arguments are run against.
+    Returns: None
+    """
+    if not server_supported():
+        raise click.ClickException("The generation server needs Unix sockets, which this platform does not provide")
+
+    stats = LatencyStats()
+    listener = bind_server_socket(socket_path)
+    click.echo(f"Generation server listening on {socket_path}", err=True)
+
+    try:
+        serving = True
+        while serving:
+            connection, _ = listener.accept()
+            with connection:
+                try:
+                    serving = handle_connection(connection, command, stats)
+                except (OSError, ValueError) as e:
+                    click.echo(f"Request failed: {e}", err=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        socket_path.unlink(missing_ok=True)
+
+
+def request_server(socket_path: Path, message: dict) -> dict | None:
+    """Send a request that needs no file descriptors, returning the reply or None when no server answers."""
+    if not server_supported() or not socket_path.exists():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(str(socket_path))
+            send_message(connection, message)
+            reply = connection.makefile("rb").readline()
+    except OSError:
+        return None
+    return json.loads(reply) if reply else None
+
+
+def format_stats(stats: dict) -> str:
+    """Render latency statistics for display."""
+    if "mean_ms" not in stats:
+        return f"{stats.get('requests', 0)} requests served"
+    return (f"{stats['requests']} requests served; latency mean {stats['mean_ms']:.1f} ms, "
+            f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms")
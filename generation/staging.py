@@ -0,0 +1,179 @@
+"""
+Staged, transactional writes into a destination directory.
+
+Files are first written into a staging directory beside the destination, on the same filesystem, so nothing in the
+destination changes while templates render. Once every file is staged, each one and its directory are flushed to
+disk, then they are renamed into place. A file being replaced is first moved into the staging directory, so a failed
+commit can put every original back. The staging directory is removed afterwards, unless putting the originals back
+did not finish, in which case it is kept and its path reported.
+"""
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import click
+
+from generation.profiling import count_filesystem_call, span
+from generation.render import RenderPlan
+
+SYNC_WORKERS = 8  # files flushed at once; fsync mostly waits on the disk, so threads overlap the waits
+
+
+@dataclass(frozen=True)
+class CommitTimings:
+    """How long each part of a commit took, in seconds."""
+    sync: float
+    rename: float
+
+    @property
+    def total(self) -> float:
+        return self.sync + self.rename
+
+
+class StagingArea:
+    """A staging directory beside a destination, holding new files and the files they replace.
+
+    Use it as a context manager so the directory is removed however the apply ends.
+    """
+
+    def __init__(self, dest_root: Path) -> None:
+        self.dest_root = dest_root
+        resolved = dest_root.resolve()
+        self.directory = resolved.parent / f".{resolved.name}.staging-{os.getpid()}"
+        self.files = self.directory / "files"
+        self.replaced = self.directory / "replaced"
+        self.rollback_incomplete = False
+
+    def __enter__(self) -> "StagingArea":
+        self.directory.mkdir(parents=True)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.rollback_incomplete:
+            click.echo(f"Could not restore every replaced file; the originals are kept in {self.replaced}", err=True)
+            return
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, target: Path) -> Path:
+        """Return where a destination file is staged."""
+        return self.files / target.relative_to(self.dest_root)
+
+    def create_parent_directories(self, plan: Iterable[RenderPlan]) -> None:
+        """Create the staging directories the plan's files are written into."""
+        for parent in sorted({self.path(item.target).parent for item in plan}, key=lambda path: len(path.parts)):
+            count_filesystem_call("mkdir")
+            parent.mkdir(parents=True, exist_ok=True)
+
+    def commit(self, plan: list[RenderPlan]) -> CommitTimings:
+        """
+        Flush the staged files and their directories to disk, then rename each into the destination.
+        Args:
+            plan: The entries whose files were staged.
+        Returns: How long the sync and the renames took.
+        If any rename fails, the destination is restored as it was and the error is raised.
+        """
+        started = time.perf_counter()
+        with span("sync_staged", "phase"):
+            staged = [self.path(item.target) for item in plan]
+            sync_files(staged)
+            sync_directories({path.parent for path in staged})
+        synced = time.perf_counter()
+
+        with span("commit_targets", "phase"):
+            created = missing_directories({item.target.parent for item in plan})
+            committed: list[tuple[Path, Path | None]] = []
+            try:
+                for directory in created:
+                    directory.mkdir()
+                for item in plan:
+                    committed.append(self.rename_into_place(item.target))
+                sync_directories({item.target.parent for item in plan})
+            except BaseException:
+                self.restore(committed, created)
+                raise
+        return CommitTimings(sync=synced - started, rename=time.perf_counter() - synced)
+
+    def rename_into_place(self, target: Path) -> tuple[Path, Path | None]:
+        """Move a staged file over its target, keeping any file it replaces; return the target and that file."""
+        replaced = None
+        count_filesystem_call("rename")
+        if target.exists():
+            replaced = self.replaced / target.relative_to(self.dest_root)
+            replaced.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(target, replaced)
+        try:
+            os.replace(self.path(target), target)
+        except BaseException:
+            if replaced is not None:
+                os.replace(replaced, target)
+            raise
+        return target, replaced
+
+    def restore(self, committed: list[tuple[Path, Path | None]], created: list[Path]) -> None:
+        """Roll back a failed commit, keeping the staging directory if that fails too, as it holds the originals."""
+        try:
+            self.roll_back(committed, created)
+        except BaseException:
+            self.rollback_incomplete = True
+            raise
+
+    def roll_back(self, committed: list[tuple[Path, Path | None]], created: list[Path]) -> None:
+        """Undo the renames done so far, newest first, and remove the directories the commit created."""
+        for target, replaced in reversed(committed):
+            if replaced is None:
+                target.unlink(missing_ok=True)
+            else:
+                os.replace(replaced, target)
+        for directory in reversed(created):
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+
+
+def missing_directories(directories: set[Path]) -> list[Path]:
+    """Return every directory, including ancestors, that does not exist yet, shallowest first."""
+    missing = set()
+    for directory in directories:
+        while not directory.exists() and directory not in missing:
+            missing.add(directory)
+            directory = directory.parent
+    return sorted(missing, key=lambda path: len(path.parts))
+
+
+def sync_files(paths: list[Path]) -> None:
+    """Flush each file to disk, several at a time."""
+    if len(paths) <= 1:
+        for path in paths:
+            sync_file(path)
+        return
+
+    with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as pool:
+        list(pool.map(sync_file, paths))
+
+
+def sync_file(path: Path) -> None:
+    """Flush a file to disk through a read-only descriptor, so read-only and hardlinked files can be synced too."""
+    count_filesystem_call("fsync")
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_directories(directories: set[Path]) -> None:
+    """Flush directory entries so the renames survive a crash. Windows cannot open directories, and needs no flush."""
+    if os.name == "nt":
+        return
+    for directory in directories:
+        count_filesystem_call("fsync")
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
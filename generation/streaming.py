@@ -0,0 +1,167 @@
+"""
+Streaming apply: writes plan entries as the template tree is scanned, for trees too large to plan up front.
+
+The apply engine's steps run as a pipeline: the tree is scanned on a background thread into a bounded queue, a
+bounded window of entries is classified and written by the workers, and results are reported in order as they
+complete. Memory then stays flat however many files the tree holds.
+"""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+
+import click
+from jinja2 import Environment
+
+from generation.apply import (
+    ApplyOptions,
+    ApplySummary,
+    PlanOutputs,
+    TargetStatus,
+    describe_plan,
+    should_overwrite,
+    target_status,
+    write_item,
+)
+from generation.digests import DigestManifest
+from generation.git_commit import GitSnapshot
+from generation.profiling import count_filesystem_call, phase, span
+from generation.render import RenderPlan
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+STREAM_QUEUE_ENTRIES = 256  # scanned entries waiting to be classified
+STREAM_WINDOW_PER_WORKER = 4  # entries in flight on the workers, per worker
+
+
+@phase
+def stream_plan(
+        env: Environment,
+        entries: Iterable[RenderPlan],
+        context: dict,
+        options: ApplyOptions,
+        digests: DigestManifest | None = None,
+        snapshot: GitSnapshot | None = None,
+) -> ApplySummary:
+    """Apply plan entries as they are produced, writing each before later ones are even scanned.
+
+    Overwrites are decided as in apply_plan; entries needing a prompt are written once it is answered, in plan order.
+    Rendering in processes and staging need the whole plan first, so those options do not apply here.
+    At most STREAM_QUEUE_ENTRIES scanned entries and STREAM_WINDOW_PER_WORKER entries per worker are held at once,
+    and what is remembered about an entry is dropped as soon as it is reported.
+    """
+    if options.dry_run:
+        describe_plan(entries)
+        return ApplySummary()
+
+    outputs = PlanOutputs(env, context, {})
+    parents = ParentDirectories()
+    copy_mode, workers = options.copy_mode, options.workers
+    decide_now = not options.confirm_overwrite
+
+    def settle(item: RenderPlan) -> tuple[RenderPlan, TargetStatus, bool]:
+        status = target_status(item, outputs, digests, copy_mode)
+        write = status is TargetStatus.NEW or status is TargetStatus.CHANGED and decide_now and options.always_overwrite
+        if write:
+            parents.create(item.target.parent)
+            write_item(item, outputs, digests, copy_mode, snapshot=snapshot)
+        return item, status, write
+
+    counts = dict.fromkeys(TargetStatus, 0)
+    written = 0
+    with span("stream_targets", "phase"):
+        for item, status, write in bounded_ordered_map(settle, prefetch(entries, STREAM_QUEUE_ENTRIES), workers,
+                                                       workers * STREAM_WINDOW_PER_WORKER):
+            counts[status] += 1
+            if status is TargetStatus.CHANGED and not decide_now and should_overwrite(item, options):
+                write_item(item, outputs, digests, copy_mode, snapshot=snapshot)
+                write = True
+            outputs.forget(item)
+            if write:
+                written += 1
+                click.echo(f"Wrote {item.target}")
+
+    summary = ApplySummary(written=written, unchanged=counts[TargetStatus.UNCHANGED],
+                           skipped=sum(counts.values()) - written - counts[TargetStatus.UNCHANGED])
+    click.echo(f"{summary.written} written, {summary.unchanged} unchanged, {summary.skipped} skipped")
+    return summary
+
+
+class ParentDirectories:
+    """Creates the parent directories of streamed entries, each only once."""
+
+    def __init__(self) -> None:
+        self.created: set[Path] = set()
+        self.lock = threading.Lock()
+
+    def create(self, directory: Path) -> None:
+        with self.lock:
+            if directory in self.created:
+                return
+            count_filesystem_call("mkdir")
+            directory.mkdir(parents=True, exist_ok=True)
+            self.created.add(directory)
+
+
+def prefetch(items: Iterable[Item], size: int) -> Iterator[Item]:
+    """Produce the items on a background thread, at most `size` ahead of the consumer.
+
+    Errors raised while producing are raised to the consumer. If the consumer stops early, the thread stops too.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+    finished = object()
+
+    def put(entry: tuple) -> bool:
+        while not stopped.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+            put((finished, None))
+        except BaseException as e:
+            put((finished, e))
+
+    threading.Thread(target=produce, name="plan-scanner", daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is finished:
+                return
+            yield item
+    finally:
+        stopped.set()
+
+
+def bounded_ordered_map(function: Callable[[Item], Result], items: Iterable[Item], workers: int,
+                        window: int) -> Iterator[Result]:
+    """Map lazily over the items on a thread pool, with at most `window` in flight, yielding results in input order."""
+    if workers <= 1:
+        yield from map(function, items)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(function, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,206 @@
+"""
+Template tree walking, the persisted plan index, and the overlay of layered templates.
+
+The walker uses os.scandir so each entry's type comes from the directory listing instead of a separate stat,
+and excluded directories are pruned before they are descended into. The index records the files found along with
+the mtime of every directory walked: adding, removing or renaming a file changes its directory's mtime, so an index
+whose directory mtimes all still match describes the tree exactly and the walk can be skipped.
+
+Trees too large to list up front can instead be scanned lazily, yielding each file as its directory is read.
+
+Layered templates are indexed one layer at a time, and their merge is kept in memory alongside the layer trees it was
+built from, so it is only redone when a layer changes.
+"""
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from generation.profiling import count_filesystem_call
+
+EXCLUDED_DIRECTORIES = frozenset({"__pycache__"})
+EXCLUDED_SUFFIXES = (".pyc",)
+INDEX_VERSION = 1
+
+# Trees already loaded by this process, so long-lived processes only re-check directory mtimes.
+_loaded_trees: dict[Path, "TemplateTree"] = {}
+# Merged files of layered templates, along with the layer trees they were merged from.
+_merged_overlays: dict[tuple[Path, ...], tuple[tuple["TemplateTree", ...], list[tuple[Path, str]]]] = {}
+
+
+@dataclass(frozen=True)
+class TemplateTree:
+    """The files of a template tree relative to its root, and the mtimes of the directories holding them."""
+    files: list[str]
+    directories: dict[str, int]
+
+
+def plan_index_dir(repo_root: Path) -> Path:
+    """Return the directory plan indexes are stored in for this repository."""
+    return repo_root / "generation" / ".cache" / "plans"
+
+
+def walk_template_tree(src_root: Path) -> TemplateTree:
+    """Walk the template tree, returning its files as sorted POSIX paths relative to the root."""
+    files: list[str] = []
+    directories: dict[str, int] = {}
+    pending = [""]
+
+    while pending:
+        relative_dir = pending.pop()
+        directory = src_root / relative_dir
+        directories[relative_dir] = directory.stat().st_mtime_ns
+        count_filesystem_call("stat")
+        count_filesystem_call("scandir")
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if entry.is_dir():
+                    if entry.name not in EXCLUDED_DIRECTORIES:
+                        pending.append(relative)
+                elif not entry.name.endswith(EXCLUDED_SUFFIXES):
+                    files.append(relative)
+
+    files.sort()
+    return TemplateTree(files=files, directories=directories)
+
+
+def scan_template_files(src_root: Path) -> Iterator[str]:
+    """Yield the files of the template tree as POSIX paths relative to the root, reading one directory at a time.
+
+    Files come out depth first: a directory's own files, sorted by name, before those of its subdirectories. That is
+    not walk_template_tree's order, where a root file such as `z.txt` sorts after `a/b.txt`, but only the directories
+    still to be read are held in memory.
+    """
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        count_filesystem_call("scandir")
+        with os.scandir(src_root / relative_dir) as entries:
+            listed = sorted(((entry.name, entry.is_dir()) for entry in entries))
+
+        subdirectories = []
+        for name, is_dir in listed:
+            relative = f"{relative_dir}/{name}" if relative_dir else name
+            if is_dir:
+                if name not in EXCLUDED_DIRECTORIES:
+                    subdirectories.append(relative)
+            elif not name.endswith(EXCLUDED_SUFFIXES):
+                yield relative
+        pending.extend(reversed(subdirectories))
+
+
+def index_path(index_dir: Path, src_root: Path) -> Path:
+    """Return the index file for a template root."""
+    name = hashlib.sha1(str(src_root.resolve()).encode("utf-8")).hexdigest()
+    return index_dir / f"{name}.json"
+
+
+def load_template_tree(index_dir: Path, src_root: Path) -> TemplateTree | None:
+    """Load the indexed tree for the root, or None when it is missing, unreadable or any directory has changed."""
+    try:
+        data = json.loads(index_path(index_dir, src_root).read_text(encoding="utf-8"))
+        if data.get("version") != INDEX_VERSION:
+            return None
+        tree = TemplateTree(files=data["files"], directories=data["directories"])
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+    return tree if directories_unchanged(src_root, tree.directories) else None
+
+
+def directories_unchanged(src_root: Path, directories: dict[str, int]) -> bool:
+    """Whether every recorded directory still exists with the same mtime."""
+    for relative_dir, mtime in directories.items():
+        count_filesystem_call("stat")
+        try:
+            if (src_root / relative_dir).stat().st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def save_template_tree(index_dir: Path, src_root: Path, tree: TemplateTree) -> None:
+    """Persist the tree for the root, replacing any previous index atomically."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+    path = index_path(index_dir, src_root)
+    staging = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    data = {"version": INDEX_VERSION, "files": tree.files, "directories": tree.directories}
+    staging.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(staging, path)
+
+
+def forget_loaded_trees() -> None:
+    """Drop the trees this process remembers, so the next lookup goes to the index or the filesystem."""
+    _loaded_trees.clear()
+    _merged_overlays.clear()
+
+
+def indexed_template_tree(src_root: Path, index_dir: Path | None) -> TemplateTree:
+    """Return the template tree, from memory or the index when still valid, otherwise by walking and re-indexing."""
+    loaded = _loaded_trees.get(src_root)
+    if loaded is not None and directories_unchanged(src_root, loaded.directories):
+        return loaded
+
+    tree = load_template_tree(index_dir, src_root) if index_dir is not None else None
+    if tree is None:
+        tree = walk_template_tree(src_root)
+        if index_dir is not None:
+            save_template_tree(index_dir, src_root, tree)
+
+    _loaded_trees[src_root] = tree
+    return tree
+
+
+def output_name(relative: str) -> str:
+    """Return the output path of a template file: its own path, without the .j2 suffix for templates."""
+    name = relative.rsplit("/", 1)[-1]
+    return relative[:-3] if name.endswith(".j2") and name != ".j2" else relative
+
+
+def overlay_template_files(layers: tuple[Path, ...], index_dir: Path | None) -> list[tuple[Path, str]]:
+    """
+    Merge the files of stacked template layers, later layers replacing earlier ones file by file.
+    Args:
+        layers: The template roots, from the base layer to the top one.
+        index_dir: Where the per-layer indexes are kept, if anywhere.
+    Returns: (layer root, relative path) for every output, in base-layer order followed by files new in later layers.
+    The merge is remembered for as long as every layer's tree is unchanged.
+    """
+    trees = tuple(indexed_template_tree(layer, index_dir) for layer in layers)
+    merged = _merged_overlays.get(layers)
+    if merged is not None and all(old is new for old, new in zip(merged[0], trees)):
+        return merged[1]
+
+    outputs: dict[str, tuple[Path, str]] = {}
+    for layer, tree in zip(layers, trees):
+        for relative in tree.files:
+            outputs[output_name(relative)] = (layer, relative)
+
+    files = list(outputs.values())
+    _merged_overlays[layers] = (trees, files)
+    return files
+
+
+def scan_overlay_files(layers: tuple[Path, ...]) -> Iterator[tuple[Path, str]]:
+    """
+    Yield the merged files of stacked template layers as they are scanned, without listing any layer up front.
+    Args:
+        layers: The template roots, from the base layer to the top one.
+    Returns: (layer root, relative path) for every output, top layer first.
+    Layers are scanned from the top one down, and a file is skipped when a layer above already produced its output.
+    Only the outputs of the layers above the base are remembered, so a large base layer streams in constant memory.
+    """
+    covered: set[str] = set()
+    for depth, layer in enumerate(reversed(layers)):
+        is_base = depth == len(layers) - 1
+        for relative in scan_template_files(layer):
+            name = output_name(relative)
+            if name in covered:
+                continue
+            if not is_base:
+                covered.add(name)
+            yield layer, relative
@@ -0,0 +1,172 @@
+"""
+Watch mode: re-render a destination whenever its template files change.
+
+Template layers are polled with os.scandir, so no file-watching dependency is needed. A change is acted on once the
+layers have been quiet for the debounce interval, which folds an editor's save, rename and touch into one update.
+Each update rebuilds the plan and re-applies only the entries whose source changed, whose output now comes from a
+different layer (as when an override is added or deleted), or that include, import or extend a changed template
+according to the dependency graph, and reports how long it took.
+"""
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import click
+from jinja2 import Environment
+
+from generation.apply import ApplyOptions, apply_plan
+from generation.caches import CacheLocations
+from generation.dependencies import DependencyGraph
+from generation.digests import DigestManifest
+from generation.render import RenderPlan, build_render_plan, env_layers, shared_jinja_env
+from generation.template_index import EXCLUDED_DIRECTORIES, EXCLUDED_SUFFIXES
+
+# A source file's identity for change detection: its mtime and size.
+Signature = tuple[int, int]
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    """How a watch polls and writes.
+
+    Attributes:
+        interval: Seconds between polls of the template layers
+        debounce: Seconds the layers must stay unchanged before an update runs
+        workers: The number of threads used to render, write and copy files
+        copy_mode: How verbatim files are copied; one of generation.options.COPY_MODES
+    """
+    interval: float = 0.25
+    debounce: float = 0.1
+    workers: int = 1
+    copy_mode: str = "auto"
+
+
+def source_snapshot(layers: tuple[Path, ...]) -> dict[Path, Signature]:
+    """Return the signature of every file in the template layers, skipping the same files the plan walk skips."""
+    snapshot: dict[Path, Signature] = {}
+    pending = list(layers)
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if entry.name not in EXCLUDED_DIRECTORIES:
+                        pending.append(Path(entry.path))
+                elif not entry.name.endswith(EXCLUDED_SUFFIXES):
+                    stat = entry.stat()
+                    snapshot[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def changed_sources(before: dict[Path, Signature], after: dict[Path, Signature]) -> set[Path]:
+    """Return the files added, removed or modified between two snapshots."""
+    return {path for path in before.keys() | after.keys() if before.get(path) != after.get(path)}
+
+
+def affected_entries(graph: DependencyGraph, plan: list[RenderPlan], previous: list[RenderPlan],
+                     changed: set[Path], layers: tuple[Path, ...]) -> list[RenderPlan]:
+    """Return the plan entries whose output may differ after the changed files, in plan order.
+
+    That is every entry whose source changed or differs from the source the previous plan had for its output, and
+    every template that references a changed template name, directly or through other templates. The graph must
+    already be refreshed against the plan.
+    """
+    previous_sources = {item.target: item.source for item in previous}
+    stale = graph.dependents(changed_template_names(graph, changed, layers))
+    return [item for item in plan
+            if item.source in changed or previous_sources.get(item.target) != item.source
+            or graph.names.get(item.source) in stale]
+
+
+def changed_template_names(graph: DependencyGraph, changed: set[Path], layers: tuple[Path, ...]) -> set[str]:
+    """Return the loader names of the changed files, including deleted ones, whose names the graph no longer maps."""
+    names = {graph.names[path] for path in changed if path in graph.names}
+    for path in changed:
+        for loader_root in layers:
+            if path.is_relative_to(loader_root):
+                names.add(path.relative_to(loader_root).as_posix())
+    return names
+
+
+def wait_for_change(layers: tuple[Path, ...], snapshot: dict[Path, Signature],
+                    options: WatchOptions) -> tuple[dict[Path, Signature], set[Path], float]:
+    """
+    Poll the layers until they change and then stay quiet for the debounce interval.
+    Args:
+        layers: The template layers to watch.
+        snapshot: The signatures the last update saw.
+        options: The polling and debounce intervals.
+    Returns: The new snapshot, the files that changed since `snapshot`, and when the first change was seen.
+    """
+    current = snapshot
+    while current == snapshot:
+        time.sleep(options.interval)
+        current = source_snapshot(layers)
+    first_seen = time.perf_counter()
+
+    settled = None
+    while settled != current:
+        settled = current
+        time.sleep(options.debounce)
+        current = source_snapshot(layers)
+    return current, changed_sources(snapshot, current), first_seen
+
+
+def apply_update(env: Environment, graph: DependencyGraph, dest_path: Path, context: dict, caches: CacheLocations,
+                 changed: set[Path], options: WatchOptions, previous: list[RenderPlan]) -> tuple[int, list[RenderPlan]]:
+    """
+    Re-apply the entries affected by the changed files, overwriting their outputs.
+    Args:
+        previous: The plan the destination was last rendered from; the other arguments are as in watch_templates.
+    Returns: How many entries were re-applied, and the plan the destination is now rendered from.
+    """
+    layers = env_layers(env)
+    plan = build_render_plan(layers, dest_path, caches.plans)
+    graph.refresh(env, plan)
+    graph.save()
+    affected = affected_entries(graph, plan, previous, changed, layers)
+    if not affected:
+        return 0, plan
+
+    digests = DigestManifest.load(dest_path)
+    apply_plan(env, affected, context,
+               ApplyOptions(always_overwrite=True, workers=options.workers, copy_mode=options.copy_mode),
+               digests=digests, fingerprints=graph.fingerprints(affected, context))
+    digests.save()
+    return len(affected), plan
+
+
+def watch_templates(layers: tuple[Path, ...], dest_path: Path, context: dict, caches: CacheLocations,
+                    options: WatchOptions) -> None:
+    """
+    Keep the destination rendered from the template layers until interrupted.
+    Args:
+        layers: The template layers, from the base layer to the top one. The destination must already be rendered.
+        dest_path: The destination directory.
+        context: The context dict to pass to the templates.
+        caches: Where the bytecode cache and plan indexes are kept.
+        options: How to poll and write.
+    Returns: None
+    """
+    env = shared_jinja_env(layers, caches.bytecode)
+    graph = DependencyGraph.load(caches.dependencies, layers)
+    snapshot = source_snapshot(layers)
+    plan = build_render_plan(layers, dest_path, caches.plans)
+    click.echo(f"Watching {', '.join(str(layer) for layer in layers)} for changes (Ctrl+C to stop)")
+
+    try:
+        while True:
+            snapshot, changed, first_seen = wait_for_change(layers, snapshot, options)
+            started = time.perf_counter()
+            try:
+                count, plan = apply_update(env, graph, dest_path, context, caches, changed, options, plan)
+            except Exception as e:  # a broken template should not end the watch; the next save can fix it
+                click.echo(f"Update failed: {e}", err=True)
+                continue
+
+            finished = time.perf_counter()
+            click.echo(f"Updated {count} outputs for {len(changed)} changed files in "
+                       f"{(finished - started) * 1000:.1f} ms "
+                       f"({(finished - first_seen) * 1000:.1f} ms after the change was seen)")
+    except KeyboardInterrupt:
+        click.echo("Stopped watching")
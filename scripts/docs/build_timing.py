@@ -0,0 +1,134 @@
+"""
+Runs `mkdocs build` inside the docs virtual environment, timing each build phase and page.
+
+This module imports mkdocs, so it must be run with the docs environment's interpreter, as scripts.docs.mkdocs does.
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+import click
+from mkdocs.__main__ import cli
+from mkdocs.commands import build as build_command
+from mkdocs.plugins import BasePlugin, event_priority
+
+SLOWEST_PAGES = 10
+FIRST = 100
+LAST = -100
+
+
+class BuildTimer(BasePlugin):
+    """
+    A plugin recording when each build event happens.
+
+    Start events run before every other plugin and end events after them, so page timings include plugin work.
+    """
+
+    def __init__(self, started: float) -> None:
+        super().__init__()
+        self.marks = [("start", started)]
+        self.page_started: dict[str, float] = {}
+        self.page_seconds: dict[str, float] = {}
+        self.site_dir: str | None = None
+
+    def mark(self, name: str) -> None:
+        self.marks.append((name, time.perf_counter()))
+
+    def page_started_now(self, page) -> None:
+        self.page_started[page.file.src_uri] = time.perf_counter()
+
+    def page_finished_now(self, page) -> None:
+        src_uri = page.file.src_uri
+        elapsed = time.perf_counter() - self.page_started.pop(src_uri)
+        self.page_seconds[src_uri] = self.page_seconds.get(src_uri, 0.0) + elapsed
+
+    @event_priority(LAST)
+    def on_config(self, config):
+        self.site_dir = config.site_dir
+        self.mark("load config")
+
+    @event_priority(LAST)
+    def on_files(self, files, config):
+        self.mark("collect files")
+
+    @event_priority(LAST)
+    def on_nav(self, nav, config, files):
+        self.mark("build navigation")
+
+    @event_priority(FIRST)
+    def on_pre_page(self, page, config, files):
+        self.page_started_now(page)
+
+    @event_priority(LAST)
+    def on_page_content(self, html, page, config, files):
+        self.page_finished_now(page)
+
+    @event_priority(LAST)
+    def on_env(self, env, config, files):
+        self.mark("render markdown")
+
+    @event_priority(FIRST)
+    def on_page_context(self, context, page, config, nav):
+        self.page_started_now(page)
+
+    @event_priority(LAST)
+    def on_post_page(self, output, page, config):
+        self.page_finished_now(page)
+
+    @event_priority(FIRST)
+    def on_post_build(self, config):
+        self.mark("render and write pages")
+
+    def report(self) -> None:
+        """
+        Prints the time spent in each phase, and the slowest pages.
+        :return: None
+        """
+        self.mark("post-build plugins")
+        print("Build phases:")
+        for (_, previous), (name, current) in zip(self.marks, self.marks[1:]):
+            print(f"  {name}: {(current - previous) * 1000:.1f} ms")
+        print(f"  total: {(self.marks[-1][1] - self.marks[0][1]) * 1000:.1f} ms")
+
+        slowest = sorted(self.page_seconds.items(), key=lambda page: page[1], reverse=True)[:SLOWEST_PAGES]
+        if slowest:
+            print("Slowest pages:")
+            for src_uri, seconds in slowest:
+                print(f"  {src_uri}: {seconds * 1000:.1f} ms")
+
+
+def run() -> None:
+    """
+    Builds the docs and records the build.
+
+    Arguments: the record file, the hash of the build inputs, then any arguments for `mkdocs build`. Once the build
+    succeeds, the record file receives the inputs hash and the site directory.
+    :return: None
+    """
+    record_file, inputs_hash, build_arguments = Path(sys.argv[1]), sys.argv[2], sys.argv[3:]
+    timer = BuildTimer(time.perf_counter())
+    original_build = build_command.build
+
+    def timed_build(config, **kwargs) -> None:
+        config.plugins["build-timing"] = timer
+        original_build(config, **kwargs)
+
+    build_command.build = timed_build
+    try:
+        cli.main(args=["build", *build_arguments], standalone_mode=False)
+    except click.ClickException as e:
+        e.show()
+        sys.exit(e.exit_code)
+    except click.Abort:
+        sys.exit(1)
+    finally:
+        build_command.build = original_build
+
+    timer.report()
+    record_file.parent.mkdir(parents=True, exist_ok=True)
+    record_file.write_text(json.dumps({"inputs_hash": inputs_hash, "site_dir": timer.site_dir}))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,9 +1,72 @@
+import hashlib
+import json
 import os
 import subprocess
 import sys
+from pathlib import Path
 
 from scripts.venv_wrappers.path import find_repo_root, venv_python
 
+BUILD_RECORD = Path(".cache") / "docs-build.json"
+
+
+def docs_inputs_hash(docs_dir: Path, build_arguments: list) -> str:
+    """
+    Hashes everything a docs build is made from.
+    :param docs_dir: The docs directory, holding mkdocs.yml, requirements.txt and content/.
+    :param build_arguments: The arguments passed to `mkdocs build`.
+    :return: A hash of the content files' paths and bytes, the config, the requirements and the arguments.
+    """
+    digest = hashlib.sha256(json.dumps(build_arguments).encode("utf-8"))
+    inputs = [docs_dir / "mkdocs.yml", docs_dir / "requirements.txt"]
+    content_dir = docs_dir / "content"
+    inputs += sorted(path for path in content_dir.rglob("*") if path.is_file())
+
+    for path in inputs:
+        if path.is_file():
+            digest.update(path.relative_to(docs_dir).as_posix().encode("utf-8") + b"\0")
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def build_is_current(docs_dir: Path, inputs_hash: str) -> bool:
+    """
+    Checks whether the last successful build was made from the same inputs and its site is still there.
+    :param docs_dir: The docs directory.
+    :param inputs_hash: The hash of the current build inputs.
+    :return: True when building again would produce the same site.
+    """
+    try:
+        record = json.loads((docs_dir / BUILD_RECORD).read_text())
+    except (OSError, ValueError):
+        return False
+    return record.get("inputs_hash") == inputs_hash and Path(record.get("site_dir") or "").is_dir()
+
+
+def build(python_executable: Path, docs_dir: Path, arguments: list) -> int:
+    """
+    Builds the docs unless nothing they are made from has changed since the last successful build.
+
+    The build itself reports how long each phase and the slowest pages took.
+    :param python_executable: The docs virtual environment's interpreter.
+    :param docs_dir: The docs directory.
+    :param arguments: The arguments after `build`; `--force` builds even when the docs are unchanged.
+    :return: The exit code.
+    """
+    force = "--force" in arguments
+    build_arguments = [argument for argument in arguments if argument != "--force"]
+    inputs_hash = docs_inputs_hash(docs_dir, build_arguments)
+
+    if not force and build_is_current(docs_dir, inputs_hash):
+        print("Docs unchanged since the last build; skipping. Pass --force to build anyway.")
+        return 0
+
+    # The timing module imports mkdocs, so it runs in the docs environment with the repo root importable.
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(docs_dir.parent),
+                                                                             os.environ.get("PYTHONPATH")])))
+    command = [python_executable, "-m", "scripts.docs.build_timing", docs_dir / BUILD_RECORD, inputs_hash]
+    return subprocess.call(command + build_arguments, cwd=docs_dir, env=environment, stderr=sys.stdout)
+
 
 def main() -> None:
     """
@@ -21,6 +84,9 @@ def main() -> None:
         sys.exit(1)
 
     try:
+        if sys.argv[1:2] == ["build"]:
+            sys.exit(build(python_executable, docs_dir, sys.argv[2:]))
+
         # We need to redirect stderr to stdout because mkdocs prints logs to stderr.
         subprocess.call(mkdocs_command + sys.argv[1:], cwd=docs_dir, stderr=sys.stdout)
     except KeyboardInterrupt:
@@ -1,14 +1,23 @@
+import argparse
+import hashlib
+import platform
 import subprocess
 import sys
+import time
 import venv
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from scripts.venv_wrappers.path import venv_python, find_repo_root
 
+REQUIREMENTS_MARKER = ".requirements-hash"
+
 
 def create_virtual_environment(directory: Path) -> Path:
     """
     Creates a virtual environment in the specified directory.
+
+    pip is left at the version bundled with the interpreter; upgrading it on every creation costs a network round trip.
     :param directory: The location of the directory to create the virtual environment in.
     :return: The path to the new virtual environment.
     """
@@ -19,54 +28,187 @@ def create_virtual_environment(directory: Path) -> Path:
         print("Virtual environment already exists.")
         return venv_dir
 
-    venv.create(venv_dir, with_pip=True, clear=False, symlinks=True, upgrade_deps=True)
+    venv.create(venv_dir, with_pip=True, clear=False, symlinks=True)
 
     return venv_dir
 
 
-def install_virtual_environment_dependencies(directory: Path, venv_dir: Path) -> None:
+def requirements_fingerprint(requirements: Path) -> str:
+    """
+    Identifies what a virtual environment was installed from.
+    :param requirements: The requirements file the environment is installed from.
+    :return: A hash of the requirements file and the interpreter version that built the environment.
+    """
+    digest = hashlib.sha256(requirements.read_bytes())
+    digest.update(f"{platform.python_implementation()} {platform.python_version()}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def dependencies_up_to_date(venv_dir: Path, fingerprint: str) -> bool:
     """
-    Installs the dependencies for the virtual environment.
+    Checks whether the virtual environment was last installed from the same requirements and interpreter.
+    :param venv_dir: The location of the virtual environment.
+    :param fingerprint: The fingerprint of the current requirements and interpreter.
+    :return: True when installing again would change nothing.
+    """
+    marker = venv_dir / REQUIREMENTS_MARKER
+    return marker.is_file() and marker.read_text().strip() == fingerprint
+
+
+def pip_install_command(venv_dir: Path, requirements: Path, wheelhouse: Path | None) -> list:
+    """
+    Builds the pip command that installs the requirements into the virtual environment.
+    :param venv_dir: The location of the virtual environment.
+    :param requirements: The requirements file to install.
+    :param wheelhouse: A local directory of wheels to install from without touching the network, if any.
+    :return: The command to run.
+    """
+    command = [venv_python(venv_dir), "-m", "pip", "install", "--disable-pip-version-check", "-r", requirements]
+    if wheelhouse is not None:
+        command += ["--no-index", "--find-links", wheelhouse]
+    return command
+
+
+def install_virtual_environment_dependencies(directory: Path, venv_dir: Path, wheelhouse: Path | None = None,
+                                             quiet: bool = False) -> str:
+    """
+    Installs the dependencies for the virtual environment, unless they are already installed.
+
+    A hash of requirements.txt and the interpreter version is recorded in the environment after a successful install,
+    and pip is skipped entirely while it still matches.
     :param directory: The location of the directory.
     :param venv_dir: The location of the virtual environment.
-    :return: None
+    :param wheelhouse: A local directory of wheels to install from offline, if any.
+    :param quiet: Whether to hold back pip's output unless it fails, for installs running side by side.
+    :return: "up to date", "installed" or "failed".
     """
+    requirements = directory / "requirements.txt"
+    fingerprint = requirements_fingerprint(requirements)
+    if dependencies_up_to_date(venv_dir, fingerprint):
+        print("Dependencies already up to date.")
+        return "up to date"
+
     print("Installing dependencies...")
-    venv_python_path = venv_python(venv_dir)
-    subprocess.run([venv_python_path, "-m", "pip", "install", "-r", directory / "requirements.txt"], cwd=directory)
+    result = subprocess.run(pip_install_command(venv_dir, requirements, wheelhouse), cwd=directory,
+                            capture_output=quiet, text=True)
+    if result.returncode != 0:
+        if quiet:
+            print(f"pip failed for {directory}:\n{result.stdout}{result.stderr}", file=sys.stderr)
+        return "failed"
+
+    (venv_dir / REQUIREMENTS_MARKER).write_text(fingerprint)
+    return "installed"
 
 
-def build_configured_virtual_environment(directory: Path) -> None:
+def build_configured_virtual_environment(directory: Path, wheelhouse: Path | None = None, quiet: bool = False) -> str:
     """
     Builds and configures a virtual environment in a directory.
 
     This assumes the presence of a requirements.txt file in the directory.
     :param directory: The directory to build the environment in.
-    :return: None
+    :param wheelhouse: A local directory of wheels to install from offline, if any.
+    :param quiet: Whether to hold back pip's output unless it fails.
+    :return: "up to date", "installed" or "failed".
     """
     venv_dir = create_virtual_environment(directory)
-    install_virtual_environment_dependencies(directory, venv_dir)
+    return install_virtual_environment_dependencies(directory, venv_dir, wheelhouse, quiet)
 
 
-def build_configured_venv_from_repo_root(path: str) -> None:
+def repo_directory(path: str) -> Path:
+    """
+    Resolves a directory relative to the repo root.
+    :param path: The path relative to the repo root, or an empty string for the root itself.
+    :return: The absolute directory.
+    """
+    repo_root = find_repo_root()
+    return repo_root / path if len(path.strip()) > 0 else repo_root
+
+
+def build_configured_venv_from_repo_root(path: str, wheelhouse: Path | None = None) -> str:
     """
     Builds and configures a virtual environment in a directory relative to the repo root.
     :param path: The path to the directory relative to the repo root.
+    :param wheelhouse: A local directory of wheels to install from offline, if any.
+    :return: "up to date", "installed" or "failed".
+    """
+    return build_configured_virtual_environment(repo_directory(path), wheelhouse)
+
+
+def fill_wheelhouse(directories: list[Path], wheelhouse: Path) -> None:
+    """
+    Downloads or builds every wheel the out-of-date environments need into the wheelhouse.
+
+    Requirements files are processed one after another against the wheelhouse itself, so a wheel shared by several
+    environments is fetched or built only once.
+    :param directories: The directories whose requirements.txt should be available offline.
+    :param wheelhouse: The directory of wheels to fill.
     :return: None
     """
-    repo_root = find_repo_root()
-    directory = repo_root / path if len(path.strip()) > 0 else repo_root
-    build_configured_virtual_environment(directory)
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    for directory in directories:
+        requirements = directory / "requirements.txt"
+        if dependencies_up_to_date(directory / ".venv", requirements_fingerprint(requirements)):
+            continue
+
+        print(f"Filling wheelhouse for {directory.name or directory}...")
+        subprocess.run([sys.executable, "-m", "pip", "wheel", "--disable-pip-version-check", "--quiet",
+                        "--wheel-dir", wheelhouse, "--find-links", wheelhouse, "-r", requirements], check=True)
+
+
+def bootstrap_timed(directory: Path, wheelhouse: Path | None, quiet: bool) -> tuple[str, float]:
+    """
+    Builds one environment, timing it.
+    :param directory: The directory to build the environment in.
+    :param wheelhouse: A local directory of wheels to install from offline, if any.
+    :param quiet: Whether to hold back pip's output unless it fails.
+    :return: The install status and the seconds it took.
+    """
+    started = time.perf_counter()
+    status = build_configured_virtual_environment(directory, wheelhouse, quiet)
+    return status, time.perf_counter() - started
+
+
+def bootstrap_environments(paths: list[str], wheelhouse: Path | None = None, refresh_wheelhouse: bool = False) -> bool:
+    """
+    Builds the virtual environments of several directories concurrently and reports how long each took.
+    :param paths: The directories relative to the repo root; an empty string is the root itself.
+    :param wheelhouse: A local directory of wheels to install from offline, if any.
+    :param refresh_wheelhouse: Whether to first fill the wheelhouse with everything the environments need.
+    :return: True when every environment is ready.
+    """
+    directories = [repo_directory(path) for path in paths]
+    if wheelhouse is not None and refresh_wheelhouse:
+        fill_wheelhouse(directories, wheelhouse)
+
+    quiet = len(directories) > 1
+    with ThreadPoolExecutor(max_workers=len(directories)) as pool:
+        results = list(pool.map(lambda directory: bootstrap_timed(directory, wheelhouse, quiet), directories))
+
+    print("Environment timings:")
+    for path, (status, seconds) in zip(paths, results):
+        print(f"  {path or '.'}: {seconds:.2f}s ({status})")
+    return all(status != "failed" for status, _ in results)
 
 
 def run() -> None:
     """
-    Bootstraps the virtual environment at the specified path or the repo root if no path is specified.
+    Bootstraps the virtual environments at the specified paths or the repo root if no path is specified.
     Returns: None
     """
-    path = sys.argv[1] if len(sys.argv) > 1 else ""
-
-    build_configured_venv_from_repo_root(path)
+    parser = argparse.ArgumentParser(description="Create virtual environments and install their requirements.txt.")
+    parser.add_argument("paths", nargs="*", default=[""],
+                        help="Directories relative to the repo root, built concurrently (default: the root)")
+    parser.add_argument("--wheelhouse", type=Path, default=None,
+                        help="Install offline from this directory of wheels instead of the package index")
+    parser.add_argument("--refresh-wheelhouse", action="store_true",
+                        help="Download or build the wheels the environments need into --wheelhouse first")
+    arguments = parser.parse_args(sys.argv[1:])
+    if arguments.refresh_wheelhouse and arguments.wheelhouse is None:
+        parser.error("--refresh-wheelhouse needs --wheelhouse")
+
+    wheelhouse = arguments.wheelhouse.resolve() if arguments.wheelhouse is not None else None
+    if not bootstrap_environments(arguments.paths, wheelhouse, arguments.refresh_wheelhouse):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import pytest
+
+from generation.render import RenderPlan, build_render_plan, jinja_env
+from tests.files import write_files
+
+
+@pytest.fixture
+def layer(tmp_path):
+    """A template layer holding a template, a partial it includes, and a verbatim file."""
+    root = tmp_path / "templates"
+    write_files(root, {
+        "README.md.j2": "# {{ project_name }}\n{% include 'footer.j2' %}",
+        "footer.j2": "by {{ author }}\n",
+        "LICENSE": "license text\n",
+    })
+    return root
+
+
+@pytest.fixture
+def dest(tmp_path):
+    path = tmp_path / "dest"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def env(layer):
+    return jinja_env(layer)
+
+
+@pytest.fixture
+def plan(layer, dest) -> dict[str, RenderPlan]:
+    """The layer's render plan against the destination, keyed by output name."""
+    return {item.target.name: item for item in build_render_plan(layer, dest)}
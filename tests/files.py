@@ -0,0 +1,9 @@
+from pathlib import Path
+
+
+def write_files(root: Path, files: dict[str, str]) -> None:
+    """Create each file under the root, with its parent directories."""
+    for relative, content in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from generation import apply
+from generation.apply import ApplyOptions, PlanOutputs, TargetStatus, apply_plan, target_status, write_atomically
+from generation.digests import DigestManifest, file_digest
+
+CONTEXT = {"project_name": "Demo", "author": "Ada"}
+
+
+@pytest.fixture
+def outputs(env):
+    return PlanOutputs(env, CONTEXT, {})
+
+
+def test_missing_target_is_new(plan, outputs):
+    assert target_status(plan["README.md"], outputs, None) is TargetStatus.NEW
+
+
+def test_target_with_the_same_content_is_unchanged(plan, outputs):
+    readme = plan["README.md"]
+    readme.target.write_bytes(outputs.content(readme))
+
+    assert target_status(readme, outputs, None) is TargetStatus.UNCHANGED
+
+
+def test_target_with_different_content_is_changed(plan, outputs):
+    plan["LICENSE"].target.write_text("edited\n")
+
+    assert target_status(plan["LICENSE"], outputs, None) is TargetStatus.CHANGED
+
+
+def test_recorded_target_is_unchanged_without_reading_it(plan, outputs, dest, monkeypatch):
+    license_entry = plan["LICENSE"]
+    license_entry.target.write_text("license text\n")
+    digests = DigestManifest.load(dest)
+    digests.record(license_entry.target, outputs.digest(license_entry))
+
+    read = []
+    monkeypatch.setattr(apply, "file_digest", lambda path: read.append(path) or file_digest(path))
+    assert target_status(license_entry, PlanOutputs(outputs.env, CONTEXT, {}), digests) is TargetStatus.UNCHANGED
+    assert license_entry.target not in read
+
+
+def test_matching_inputs_fingerprint_skips_rendering(plan, env, dest, monkeypatch):
+    readme = plan["README.md"]
+    readme.target.write_text("rendered earlier\n")
+    digests = DigestManifest.load(dest)
+    digests.record(readme.target, "digest", inputs="fingerprint")
+    outputs = PlanOutputs(env, CONTEXT, {}, fingerprints={readme.target: "fingerprint"})
+
+    monkeypatch.setattr(outputs, "measure", lambda item: pytest.fail("rendered"))
+    assert target_status(readme, outputs, digests) is TargetStatus.UNCHANGED
+
+
+def test_hardlinked_target_is_changed_unless_hardlinks_are_wanted(plan, outputs):
+    license_entry = plan["LICENSE"]
+    os.link(license_entry.source, license_entry.target)
+
+    assert target_status(license_entry, outputs, None, copy_mode="auto") is TargetStatus.CHANGED
+    assert target_status(license_entry, outputs, None, copy_mode="hardlink") is TargetStatus.UNCHANGED
+
+
+def test_atomic_write_keeps_the_target_when_the_stream_fails(dest):
+    target = dest / "file.txt"
+    target.write_text("precious")
+
+    def chunks():
+        yield b"partial"
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError, match="render failed"):
+        write_atomically(target, chunks())
+
+    assert target.read_text() == "precious"
+    assert os.listdir(dest) == ["file.txt"]
+
+
+def test_atomic_write_keeps_the_target_permissions(dest):
+    target = dest / "script.sh"
+    target.write_text("old")
+    target.chmod(0o750)
+
+    write_atomically(target, [b"new ", b"content"])
+
+    assert target.read_text() == "new content"
+    assert target.stat().st_mode & 0o777 == 0o750
+
+
+def test_apply_leaves_changed_files_alone_unless_overwriting(plan, env, dest):
+    plan["LICENSE"].target.write_text("edited\n")
+    items = list(plan.values())
+
+    summary = apply_plan(env, items, CONTEXT, ApplyOptions())
+    assert (summary.written, summary.unchanged, summary.skipped) == (len(items) - 1, 0, 1)
+    assert plan["LICENSE"].target.read_text() == "edited\n"
+
+    summary = apply_plan(env, items, CONTEXT, ApplyOptions(always_overwrite=True))
+    assert (summary.written, summary.unchanged, summary.skipped) == (1, len(items) - 1, 0)
+    assert plan["LICENSE"].target.read_text() == "license text\n"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_apply_writes_every_entry_with_any_number_of_workers(plan, env, workers):
+    summary = apply_plan(env, plan.values(), CONTEXT, ApplyOptions(workers=workers))
+
+    assert summary.written == len(plan)
+    assert plan["README.md"].target.read_text().startswith("# Demo")
+    assert plan["LICENSE"].target.read_text() == "license text\n"
+
+
+def test_dry_run_writes_nothing(plan, env, dest):
+    apply_plan(env, plan.values(), CONTEXT, ApplyOptions(dry_run=True))
+
+    assert list(dest.iterdir()) == []
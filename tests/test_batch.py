@@ -0,0 +1,50 @@
+import json
+
+import click
+import pytest
+
+from generation.batch import BatchOptions, read_manifest, render_batch
+from generation.caches import CacheLocations
+
+ROW = {"project_name": "Demo", "repo_name": "demo", "author": "Ada"}
+
+
+def test_jsonl_manifest_yields_one_job_per_row(tmp_path):
+    manifest = tmp_path / "projects.jsonl"
+    manifest.write_text(json.dumps({**ROW, "path": "one"}) + "\n\n" + json.dumps({**ROW, "path": "two"}) + "\n")
+
+    jobs = read_manifest(manifest)
+
+    assert [job.destination.name for job in jobs] == ["one", "two"]
+    assert jobs[0].context["project_name"] == "Demo"
+
+
+def test_csv_manifest_yields_one_job_per_row(tmp_path):
+    manifest = tmp_path / "projects.csv"
+    manifest.write_text("path,project_name,author\none,Demo,Ada\n")
+
+    jobs = read_manifest(manifest)
+
+    assert [job.destination.name for job in jobs] == ["one"]
+    assert jobs[0].context["author"] == "Ada"
+
+
+def test_row_without_a_path_names_its_line(tmp_path):
+    manifest = tmp_path / "projects.jsonl"
+    manifest.write_text(json.dumps({**ROW, "path": "one"}) + "\n" + json.dumps(ROW) + "\n")
+
+    with pytest.raises(click.ClickException, match="line 2 is missing 'path'"):
+        read_manifest(manifest)
+
+
+def test_batch_renders_every_destination_from_one_plan(layer, tmp_path):
+    manifest = tmp_path / "projects.jsonl"
+    manifest.write_text("".join(json.dumps({**ROW, "project_name": name, "path": str(tmp_path / name)}) + "\n"
+                                for name in ("One", "Two")))
+    options = BatchOptions(dry_run=False, always_overwrite=False, bootstrap=False)
+
+    results = render_batch(layer, CacheLocations(), read_manifest(manifest), workers=1, options=options)
+
+    assert [result.files_written for result in results] == [3, 3]
+    assert (tmp_path / "One" / "README.md").read_text().startswith("# One")
+    assert (tmp_path / "Two" / "LICENSE").read_text() == "license text\n"
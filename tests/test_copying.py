@@ -0,0 +1,62 @@
+import os
+
+import click
+import pytest
+
+from generation import copying
+from generation.copying import copy_verbatim
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "source.txt"
+    path.write_text("template")
+    return path
+
+
+@pytest.fixture
+def target(dest):
+    path = dest / "target.txt"
+    path.write_text("precious")
+    return path
+
+
+def test_failed_reflink_leaves_the_existing_target(source, target, monkeypatch):
+    monkeypatch.setattr(copying, "try_reflink", lambda source_file, target_file: False)
+
+    with pytest.raises(click.ClickException, match="Cannot reflink"):
+        copy_verbatim(source, target, "reflink")
+
+    assert target.read_text() == "precious"
+    assert os.listdir(target.parent) == ["target.txt"]
+
+
+def test_failed_hardlink_leaves_the_existing_target(source, target, monkeypatch):
+    def refuse(source, target):
+        raise OSError(1, "Operation not permitted")
+    monkeypatch.setattr(os, "link", refuse)
+
+    with pytest.raises(click.ClickException, match="Cannot hardlink"):
+        copy_verbatim(source, target, "hardlink")
+
+    assert target.read_text() == "precious"
+    assert os.listdir(target.parent) == ["target.txt"]
+
+
+@pytest.mark.parametrize("copy_mode", ["auto", "copy"])
+def test_copy_replaces_the_target_with_the_source(source, target, copy_mode):
+    copy_verbatim(source, target, copy_mode)
+
+    assert target.read_text() == "template"
+    assert os.stat(target).st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+def test_copy_over_a_hardlink_of_the_source_leaves_the_source_alone(source, target):
+    copy_verbatim(source, target, "hardlink")
+    assert os.path.samefile(source, target)
+    copy_verbatim(source, target, "hardlink")
+    assert os.listdir(target.parent) == ["target.txt"]
+
+    copy_verbatim(source, target, "auto")
+    assert not os.path.samefile(source, target)
+    assert source.read_text() == target.read_text() == "template"
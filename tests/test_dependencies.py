@@ -0,0 +1,35 @@
+from generation.dependencies import DependencyGraph
+
+from tests.files import write_files
+
+CONTEXT = {"project_name": "Demo", "author": "Ada", "unused": "value"}
+
+
+def readme_fingerprint(env, plan, context) -> str | None:
+    graph = DependencyGraph.load(None, plan["README.md"].source.parent)
+    graph.refresh(env, list(plan.values()))
+    return graph.fingerprint(graph.names[plan["README.md"].source], context)
+
+
+def test_fingerprint_changes_with_an_included_template(env, plan, layer):
+    before = readme_fingerprint(env, plan, CONTEXT)
+    write_files(layer, {"footer.j2": "written by {{ author }}\n"})
+
+    assert readme_fingerprint(env, plan, CONTEXT) != before
+
+
+def test_fingerprint_changes_with_a_variable_the_template_reads(env, plan):
+    before = readme_fingerprint(env, plan, CONTEXT)
+
+    assert readme_fingerprint(env, plan, {**CONTEXT, "author": "Grace"}) != before
+    assert readme_fingerprint(env, plan, {**CONTEXT, "project_name": "Other"}) != before
+
+
+def test_fingerprint_ignores_variables_no_template_reads(env, plan):
+    assert readme_fingerprint(env, plan, {**CONTEXT, "unused": "changed"}) == readme_fingerprint(env, plan, CONTEXT)
+
+
+def test_computed_include_has_no_fingerprint(env, plan, layer):
+    write_files(layer, {"README.md.j2": "{% include project_name ~ '.j2' %}"})
+
+    assert readme_fingerprint(env, plan, CONTEXT) is None
@@ -0,0 +1,58 @@
+import os
+
+from generation.digests import MANIFEST_NAME, DigestManifest, bytes_digest
+
+
+def test_manifest_round_trips_through_disk(dest):
+    target = dest / "docs" / "index.md"
+    target.parent.mkdir()
+    target.write_bytes(b"content")
+    manifest = DigestManifest.load(dest)
+    manifest.record(target, bytes_digest(b"content"), inputs="fingerprint")
+    manifest.save()
+
+    loaded = DigestManifest.load(dest)
+    assert loaded.entries == manifest.entries
+    assert loaded.matches(target, bytes_digest(b"content"), target.stat())
+    assert loaded.inputs_match(target, "fingerprint", target.stat())
+
+
+def test_touching_or_resizing_a_target_invalidates_its_entry(dest):
+    target = dest / "file.txt"
+    target.write_bytes(b"content")
+    manifest = DigestManifest.load(dest)
+    manifest.record(target, bytes_digest(b"content"), inputs="fingerprint")
+
+    stat = target.stat()
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert not manifest.matches(target, bytes_digest(b"content"), target.stat())
+    assert not manifest.inputs_match(target, "fingerprint", target.stat())
+
+    target.write_bytes(b"longer content")
+    assert not manifest.matches(target, bytes_digest(b"content"), target.stat())
+
+
+def test_other_digests_or_inputs_do_not_match(dest):
+    target = dest / "file.txt"
+    target.write_bytes(b"content")
+    manifest = DigestManifest.load(dest)
+    manifest.record(target, bytes_digest(b"content"), inputs="fingerprint")
+
+    assert not manifest.matches(target, bytes_digest(b"other"), target.stat())
+    assert not manifest.inputs_match(target, "other fingerprint", target.stat())
+    assert not manifest.inputs_recorded(target, None)
+
+
+def test_unreadable_manifest_loads_empty(dest):
+    (dest / MANIFEST_NAME).write_text("{not json")
+
+    assert DigestManifest.load(dest).entries == {}
+
+
+def test_targets_outside_the_root_are_not_recorded(dest, tmp_path):
+    outside = tmp_path / "outside.txt"
+    outside.write_text("content")
+    manifest = DigestManifest.load(dest)
+    manifest.record(outside, bytes_digest(b"content"))
+
+    assert manifest.entries == {}
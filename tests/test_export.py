@@ -0,0 +1,28 @@
+import os
+from pathlib import Path
+
+from generation.export import render_to_memory
+from generation.render import normalize_context
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_render_to_memory_accepts_a_relative_template_root(tmp_path, monkeypatch):
+    layer = tmp_path / "templates" / "demo"
+    (layer / "docs").mkdir(parents=True)
+    (layer / "README.md.j2").write_text("# {{ project_name }}\n")
+    (layer / "docs" / "index.md").write_text("static\n")
+    monkeypatch.chdir(tmp_path)
+
+    context = normalize_context("Demo", "demo", "", "", "", "", "", "")
+    outputs = render_to_memory(Path("templates/demo"), context)
+
+    assert outputs == {"README.md": f"# Demo{os.linesep}".encode(), "docs/index.md": b"static\n"}
+
+
+def test_render_to_memory_renders_the_general_template():
+    context = normalize_context("Demo", "demo", "Ada", "url", "remote", "docs", "c@e", "s@e")
+    outputs = render_to_memory(REPO_ROOT / "templates" / "general", context)
+
+    assert "README.md" in outputs
+    assert b"Demo" in outputs["README.md"]
@@ -0,0 +1,34 @@
+import shutil
+import subprocess
+
+import pytest
+
+from generation import apply
+from generation.apply import ApplyOptions, apply_plan
+from generation.git_commit import initial_commit
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+
+CONTEXT = {"project_name": "Demo", "author": "Ada"}
+
+
+@pytest.fixture(autouse=True)
+def git_identity(monkeypatch):
+    for variable in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+        monkeypatch.setenv(variable, "Ada")
+    for variable in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+        monkeypatch.setenv(variable, "ada@example.com")
+
+
+@pytest.mark.parametrize("max_kept_bytes", [apply.MAX_KEPT_BYTES, 4])
+def test_initial_commit_holds_every_written_file(plan, env, dest, monkeypatch, max_kept_bytes):
+    # Outputs larger than the limit are streamed to git from the written file instead of kept in memory
+    monkeypatch.setattr(apply, "MAX_KEPT_BYTES", max_kept_bytes)
+
+    with initial_commit(dest, "", push=False) as snapshot:
+        apply_plan(env, plan.values(), CONTEXT, ApplyOptions(), snapshot=snapshot)
+
+    for name, item in plan.items():
+        committed = subprocess.run(["git", "show", f"HEAD:{name}"], cwd=dest, capture_output=True, check=True).stdout
+        assert committed == item.target.read_bytes()
+    assert subprocess.run(["git", "status", "--porcelain"], cwd=dest, capture_output=True, text=True).stdout == ""
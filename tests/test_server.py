@@ -0,0 +1,20 @@
+import os
+import stat
+
+import pytest
+
+from generation import server
+from generation.server import bind_server_socket, server_supported
+
+pytestmark = pytest.mark.skipif(not server_supported(), reason="needs Unix sockets")
+
+
+def test_socket_is_private_from_the_moment_it_is_bound(tmp_path, monkeypatch):
+    socket_path = tmp_path / "server.sock"
+    monkeypatch.setattr(server.os, "chmod", lambda path, mode: None)
+
+    listener = bind_server_socket(socket_path)
+    try:
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) & 0o077 == 0
+    finally:
+        listener.close()
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from generation.render import RenderPlan
+from generation.staging import StagingArea
+
+
+def stage(staging: StagingArea, plan: list[RenderPlan], content: str) -> None:
+    staging.create_parent_directories(plan)
+    for item in plan:
+        staging.path(item.target).write_text(content)
+
+
+@pytest.fixture
+def plan(dest, tmp_path):
+    (dest / "existing.txt").write_text("original")
+    return [RenderPlan(source=tmp_path, target=dest / name, is_template=False)
+            for name in ("existing.txt", "new/created.txt", "zz-fails.txt")]
+
+
+def fail_on(name, real_rename):
+    """Fail the rename into place of one file, letting the others through."""
+    def rename(source, target):
+        if os.path.basename(target) == name:
+            raise OSError("rename failed")
+        real_rename(source, target)
+    return rename
+
+
+def test_commit_moves_every_staged_file_into_place(plan, dest):
+    with StagingArea(dest) as staging:
+        stage(staging, plan, "staged")
+        staging.commit(plan)
+
+    assert all(item.target.read_text() == "staged" for item in plan)
+    assert not staging.directory.exists()
+
+
+def test_commit_moves_read_only_files_into_place(plan, dest):
+    with StagingArea(dest) as staging:
+        stage(staging, plan, "staged")
+        for item in plan:
+            staging.path(item.target).chmod(0o444)
+        staging.commit(plan)
+
+    assert all(item.target.read_text() == "staged" for item in plan)
+    assert all(item.target.stat().st_mode & 0o777 == 0o444 for item in plan)
+
+
+def test_failed_rename_restores_the_destination(plan, dest, monkeypatch):
+    monkeypatch.setattr(os, "replace", fail_on("zz-fails.txt", os.replace))
+
+    with pytest.raises(OSError, match="rename failed"):
+        with StagingArea(dest) as staging:
+            stage(staging, plan, "staged")
+            staging.commit(plan)
+
+    assert (dest / "existing.txt").read_text() == "original"
+    assert sorted(path.name for path in dest.iterdir()) == ["existing.txt"]
+    assert not staging.directory.exists()
+
+
+def test_staging_directory_is_kept_when_rollback_fails(plan, dest, monkeypatch):
+    monkeypatch.setattr(os, "replace", fail_on("zz-fails.txt", os.replace))
+    monkeypatch.setattr(StagingArea, "roll_back", lambda self, committed, created: (_ for _ in ()).throw(
+        OSError("rollback failed")))
+
+    with pytest.raises(OSError, match="rollback failed"):
+        with StagingArea(dest) as staging:
+            stage(staging, plan, "staged")
+            staging.commit(plan)
+
+    assert (staging.replaced / "existing.txt").read_text() == "original"